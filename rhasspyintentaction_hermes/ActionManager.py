@@ -2,7 +2,67 @@ import typing
 import os
 import json
 import importlib
-from asyncio.log import logger
+import asyncio
+import logging
+
+_LOGGER = logging.getLogger(__name__)
+
+class Outcome():
+    """Result of handling an intent."""
+
+    OK = "ok"
+    NO_RESPONSE = "no_response"
+    ERROR = "error"
+    QUEUE_TIMEOUT = "queue_timeout"
+    NO_ACTION = "no_action"
+    NOT_READY = "not_ready"
+
+# -------------------------------------------------------------------------
+
+class ConcurrencyLimit():
+    """Bounds concurrent calls, callers queue for at most max_wait seconds."""
+    def __init__(
+        self,
+        max_concurrency : typing.Optional[int] = None,
+        max_wait : typing.Optional[float] = None
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_wait = max_wait
+        self.waiting = 0
+        self.running = 0
+        self._semaphore : typing.Optional[asyncio.Semaphore] = None
+
+    @property
+    def semaphore(self) -> typing.Optional[asyncio.Semaphore]:
+        """Get or create semaphore, None if unlimited"""
+        if self._semaphore is None and self.max_concurrency:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        return self._semaphore
+
+    async def acquire(self) -> bool:
+        """Wait for a free slot, False if max_wait elapsed first."""
+        if self.semaphore:
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self.semaphore.acquire(), self.max_wait)
+            except asyncio.TimeoutError:
+                return False
+            finally:
+                self.waiting -= 1
+
+        self.running += 1
+        return True
+
+    def release(self):
+        self.running -= 1
+        if self.semaphore:
+            self.semaphore.release()
+
+    def get_statistics(self) -> typing.Dict[str, int]:
+        return {"waiting" : self.waiting, "running" : self.running}
+
+# -------------------------------------------------------------------------
 
 class Action():
     def __init__(
@@ -11,12 +71,18 @@ class Action():
     ):
         self._name = data["name"]
         self._handler = data.get("handler")
+        self._limit = ConcurrencyLimit(data.get("max_concurrency"), data.get("max_queue_wait"))
         
     @property
     def name(self) -> str:
         return self._name
     
     
+    @property
+    def limit(self) -> ConcurrencyLimit:
+        return self._limit
+    
+    
     @property
     def handler(self):
         return self._handler
@@ -26,13 +92,39 @@ class Action():
     def handler(self, handler):
         self._handler = handler
 
+
+    async def handle_intent(self, intent) -> typing.Tuple[str, typing.Optional[typing.Dict[str, typing.Any]]]:
+        """Handle intent within the concurrency limit of the action, returns outcome and response."""
+        if not self._handler:
+            return (Outcome.NO_ACTION, None)
+
+        if not await self._limit.acquire():
+            _LOGGER.warning(f"Action {self._name}: no free slot after {self._limit.max_wait} seconds, dropping intent")
+            return (Outcome.QUEUE_TIMEOUT, None)
+
+        try:
+            response_dict = await self._handler.handle_intent(intent)
+        except Exception as e:
+            _LOGGER.exception(f"Action {self._name}: " + str(e))
+            return (Outcome.ERROR, None)
+        finally:
+            self._limit.release()
+
+        return (Outcome.OK if response_dict else Outcome.NO_RESPONSE, response_dict)
+
 # -------------------------------------------------------------------------
 
 class ActionManagerEnvironment():
-    def __init__(self):
+    def __init__(
+        self,
+        max_subprocesses : typing.Optional[int] = None
+    ):
         self._base_path = os.environ["RHASSPY_PROFILE_DIR"]
         self._action_path = os.path.join(self._base_path, "actions")
         
+        # Shared by all actions spawning processes
+        self.subprocess_limit = ConcurrencyLimit(max_subprocesses)
+        
     def get_action_repository_path(self) -> str:
         return self._action_path
     
@@ -48,6 +140,10 @@ class ActionManagerEnvironment():
             @property
             def self_directory(self):
                 return os.path.join(action_manager._action_path, action.name)
+            
+            @property
+            def subprocess_limit(self) -> ConcurrencyLimit:
+                return action_manager.subprocess_limit
         
         return ActionEnvironment()
     
@@ -62,14 +158,20 @@ class ActionManager():
         "buildin.homeassistant" : ".handlers.homeassistant.HomeAssistantIntendHandler"
     }
 
-    def __init__(self):
+    def __init__(
+        self,
+        max_subprocesses : typing.Optional[int] = None
+    ):
         super().__init__()
         
         self.used_action_names = None
         self.modules = {}
         self.actions : typing.Dict[str, Action] = {}
         
-        self._environment = ActionManagerEnvironment()
+        self._repository_loaded : typing.Optional[asyncio.Event] = None
+        self._action_ready : typing.Dict[str, asyncio.Event] = {}
+        
+        self._environment = ActionManagerEnvironment(max_subprocesses)
 
     # -------------------------------------------------------------------------
 
@@ -87,16 +189,18 @@ class ActionManager():
     
     
     def get_module(self, name):
+        """Import handler module on first use, so only used handlers and their dependencies are loaded"""
         m = self.modules.get(name)
         if m != None:
             return m
         
         try:
             if name.startswith("."):
-                m = importlib.import_module(name, "rhasspyhomeassistant_hermes")
+                m = importlib.import_module(name, __package__)
             else:
                 m = importlib.import_module(name)
         except Exception as e:
+            _LOGGER.error(f"Handler module {name}: " + str(e))
             m = None
             
         self.modules[name] = m
@@ -128,78 +232,186 @@ class ActionManager():
     # -------------------------------------------------------------------------
 
     
-    def prepare(self):
-        def load_action_repository() -> typing.Dict[str, typing.Dict] :
-            action_repository_path = self._environment.get_action_repository_path()
-            
-            action_defs : typing.Dict[str, typing.Dict] = {}
-    
-            sub_dirs = []
+    def load_action_repository(self) -> typing.Dict[str, typing.Dict] :
+        action_repository_path = self._environment.get_action_repository_path()
+        
+        action_defs : typing.Dict[str, typing.Dict] = {}
+
+        sub_dirs = []
+        try:
+            for o in os.listdir(action_repository_path):
+                if os.path.isdir(os.path.join(action_repository_path,o)) and (self.used_action_names == None or o in self.used_action_names):
+                    sub_dirs.append(o)
+        except FileNotFoundError as e:
+            _LOGGER.error("Action Repository: " + str(e))
+        
+        for sub_dir in sub_dirs:
             try:
-                for o in os.listdir(action_repository_path):
-                    if os.path.isdir(os.path.join(action_repository_path,o)) and (self.used_action_names == None or o in self.used_action_names):
-                        sub_dirs.append(o)
-            except FileNotFoundError as e:
-                _LOGGER.error("Action Repository: " + str(e))
+                with open(os.path.join(action_repository_path, sub_dir, "manifest.json") , 'r') as manifest_file:
+                    manifest = json.load(manifest_file)
+                    action_defs[sub_dir] = manifest
+            except Exception as e:
+                _LOGGER.error(f"Action Manifest {sub_dir}: " + str(e))
+                continue
+        
+        return action_defs
+        
+    # -------------------------------------------------------------------------
+
+
+    def extract_handler(self, name) -> (str,str):
+        if not name:
+            return (None,None)
+
+        if name.startswith("buildin."):
+            name = ActionManager._buildin_handler_map.get(name)
             
-            for sub_dir in sub_dirs:
-                try:
-                    with open(os.path.join(action_repository_path, sub_dir, "manifest.json") , 'r') as manifest_file:
-                        manifest = json.load(manifest_file)
-                        action_defs[sub_dir] = manifest
-                except Exception as e:
-                    _LOGGER.error(f"Action Manifest {sub_dir}: " + str(e))
-                    continue
+
+        if name.startswith("."): 
+            parts = name[1:].split('.')
+            module_name = "." + ".".join(parts[:-1])  
+        else:
+            parts = name.split('.')
+            module_name = ".".join(parts[:-1])  
             
-            return action_defs
+        if len(parts) < 2:
+            return (None,None)
         
-        # -------------------------------------------------------------------------
+        return (module_name, parts[-1])
 
+    # -------------------------------------------------------------------------
 
-        def extract_handler(name) -> (str,str):
-            if not name:
-                return (None,None)
 
-            if name.startswith("buildin."):
-                name = ActionManager._buildin_handler_map.get(name)
-                
+    def prepare_action(
+        self,
+        action_name : str,
+        action_def : typing.Dict[str, typing.Any]
+    ) -> Action:
+        handler_module, handler_class = self.extract_handler(action_def.get("type"))
+        cls = self.get_class(handler_module, handler_class)
+
+        action = Action({
+            "name" : action_name,
+            "max_concurrency" : action_def.get("max_concurrency"),
+            "max_queue_wait" : action_def.get("max_queue_wait")
+        })
+        
+        if (cls):
+            action.handler = cls(
+                                self._environment.create_action_environment(action)
+                            )
+            action.handler.initialize()
+
+        else:
+            action.handler = None
+
+        return action
+
+    # -------------------------------------------------------------------------
 
-            if name.startswith("."): 
-                parts = name[1:].split('.')
-                module_name = "." + ".".join(parts[:-1])  
-            else:
-                parts = name.split('.')
-                module_name = ".".join(parts[:-1])  
-                
-            if len(parts) < 2:
-                return (None,None)
-            
-            return (module_name, parts[-1])
     
-        # -------------------------------------------------------------------------
+    @property
+    def repository_loaded(self) -> asyncio.Event:
+        """Get or create event set once the action repository was read"""
+        if self._repository_loaded is None:
+            self._repository_loaded = asyncio.Event()
 
+        return self._repository_loaded
 
-        action_repository = load_action_repository()
-        
-        for action_name, action_def in action_repository.items():
-            handler_module, handler_class = extract_handler(action_def.get("type"))
-            cls = self.get_class(handler_module, handler_class)
+    # -------------------------------------------------------------------------
 
-            action = Action({
-                "name" : action_name
-            })
-            
-            if (cls):
-                action.handler = cls(
-                                    self._environment.create_action_environment(action)
-                                )
-                action.handler.initialize()
 
-            else:
-                action.handler = None
+    async def prepare_async(self):
+        """Prepare actions concurrently without blocking the event loop.
+
+        Every action gets a ready event as soon as the repository is read, so
+        callers can wait for a single action instead of the whole repository.
+        """
+        loop = asyncio.get_running_loop()
+
+        try:
+            action_repository = await loop.run_in_executor(None, self.load_action_repository)
+
+            for action_name in action_repository.keys():
+                self._action_ready[action_name] = asyncio.Event()
+        finally:
+            # Waiters fail fast if the repository could not be read
+            self.repository_loaded.set()
 
-              
-            self.actions[action_name] = action 
+        async def prepare_one(action_name, action_def):
+            try:
+                action = await loop.run_in_executor(
+                    None, self.prepare_action, action_name, action_def
+                )
+                self.actions[action_name] = action
+            except Exception as e:
+                _LOGGER.exception(f"Prepare action {action_name}: " + str(e))
+                return
+            finally:
+                self._action_ready[action_name].set()
+
+            # Optional hook for handlers with background tasks. Action is
+            # already usable, so slow warm-up does not hold back intents.
+            if hasattr(action.handler, "start"):
+                try:
+                    await action.handler.start()
+                except Exception as e:
+                    _LOGGER.exception(f"Start action {action_name}: " + str(e))
+
+        await asyncio.gather(
+            *[prepare_one(name, action_def) for name, action_def in action_repository.items()]
+        )
+
+    # -------------------------------------------------------------------------
+
+
+    async def stop_async(self):
+        """Stop background tasks of all action handlers"""
+        for action in self.actions.values():
+            if hasattr(action.handler, "stop"):
+                try:
+                    await action.handler.stop()
+                except Exception as e:
+                    _LOGGER.exception(f"Stop action {action.name}: " + str(e))
+
+    # -------------------------------------------------------------------------
+
+
+    async def wait_action(
+        self, 
+        name: str,
+        timeout: typing.Optional[float] = None
+    ) -> typing.Optional[Action]:
+        """Wait up to timeout seconds for an action to be prepared, raises asyncio.TimeoutError."""
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+
+        def remaining():
+            return None if deadline is None else max(0.0, deadline - loop.time())
+
+        try:
+            await asyncio.wait_for(self.repository_loaded.wait(), remaining())
+
+            ready = self._action_ready.get(name)
+            if ready:
+                await asyncio.wait_for(ready.wait(), remaining())
+        except asyncio.TimeoutError:
+            _LOGGER.warning(f"Action {name} not ready after {timeout} seconds")
+            raise
+
+        return self.actions.get(name)
+
+    # -------------------------------------------------------------------------
+
+    
+    def get_statistics(self) -> typing.Dict[str, typing.Any]:
+        """Waiting and running counts of subprocesses and of each action"""
+        return {
+            "subprocesses" : self._environment.subprocess_limit.get_statistics(),
+            "actions" : {
+                name : action.limit.get_statistics() for name, action in self.actions.items()
+            }
+        }
 
     # -------------------------------------------------------------------------
 
@@ -0,0 +1,281 @@
+import typing
+import os
+import json
+import time
+import asyncio
+import logging
+
+_LOGGER = logging.getLogger(__name__)
+
+class AuditFormat():
+    """Storage of audit records."""
+
+    SQLITE = "sqlite"
+    JSONL = "jsonl"
+
+# -------------------------------------------------------------------------
+
+class SqliteAuditWriter():
+    def __init__(
+        self,
+        path : str,
+        retention_days : typing.Optional[float]
+    ):
+        self._path = path
+        self._retention_days = retention_days
+        self._connection = None
+
+    def open(self):
+        # Imported here, sqlite3 is not needed without audit log
+        import sqlite3
+
+        # Batches are written from executor threads, one at a time
+        self._connection = sqlite3.connect(self._path, check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS audit ("
+            "timestamp REAL, intent TEXT, site_id TEXT, session_id TEXT, action TEXT, "
+            "latency REAL, outcome TEXT, speech TEXT)"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS audit_timestamp ON audit (timestamp)")
+        self._connection.commit()
+
+    def write(self, records : typing.List[typing.Dict[str, typing.Any]]):
+        with self._connection:
+            self._connection.executemany(
+                "INSERT INTO audit VALUES "
+                "(:timestamp, :intent, :site_id, :session_id, :action, :latency, :outcome, :speech)",
+                records
+            )
+
+    def expire(self):
+        if self._retention_days:
+            with self._connection:
+                self._connection.execute(
+                    "DELETE FROM audit WHERE timestamp < ?",
+                    (time.time() - self._retention_days * 86400,)
+                )
+
+    def close(self):
+        if self._connection:
+            self._connection.close()
+            self._connection = None
+
+# -------------------------------------------------------------------------
+
+class JsonLinesAuditWriter():
+    def __init__(
+        self,
+        path : str,
+        retention_days : typing.Optional[float],
+        max_bytes : int = 10 * 1024 * 1024
+    ):
+        self._path = path
+        self._retention_days = retention_days
+        self._max_bytes = max_bytes
+
+    def open(self):
+        pass
+
+    def write(self, records : typing.List[typing.Dict[str, typing.Any]]):
+        with open(self._path, "a") as audit_file:
+            for record in records:
+                audit_file.write(json.dumps(record) + "\n")
+            size = audit_file.tell()
+
+        if size >= self._max_bytes:
+            rotated_path = self._path + "." + time.strftime("%Y%m%d-%H%M%S")
+
+            # Several rotations within a second must not overwrite each other
+            target_path = rotated_path
+            sequence = 0
+            while os.path.exists(target_path):
+                sequence += 1
+                target_path = f"{rotated_path}.{sequence}"
+
+            os.rename(self._path, target_path)
+
+    def expire(self):
+        if not self._retention_days:
+            return
+
+        directory, name = os.path.split(os.path.abspath(self._path))
+        oldest = time.time() - self._retention_days * 86400
+
+        for file_name in os.listdir(directory):
+            file_path = os.path.join(directory, file_name)
+            if file_name.startswith(name + ".") and os.path.getmtime(file_path) < oldest:
+                os.remove(file_path)
+
+    def close(self):
+        pass
+
+# -------------------------------------------------------------------------
+
+class AuditLog():
+    """Records handled intents without blocking the event loop.
+
+    Records are queued in memory and written in batches by a background task.
+    If the queue is full, records are dropped and counted.
+    """
+    def __init__(
+        self,
+        path : str,
+        audit_format : str = AuditFormat.SQLITE,
+        retention_days : typing.Optional[float] = None,
+        queue_size : int = 1000,
+        batch_size : int = 100,
+        expire_interval : float = 3600.0
+    ):
+        if audit_format == AuditFormat.SQLITE:
+            self._writer = SqliteAuditWriter(path, retention_days)
+        elif audit_format == AuditFormat.JSONL:
+            self._writer = JsonLinesAuditWriter(path, retention_days)
+        else:
+            raise ValueError(f"Unsupported audit format (got {audit_format})")
+
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.expire_interval = expire_interval
+
+        self.written = 0
+        self.dropped = 0
+
+        self._queue : typing.Optional[asyncio.Queue] = None
+        self._task : typing.Optional[asyncio.Future] = None
+        self._pending_write : typing.Optional[asyncio.Future] = None
+
+    # -------------------------------------------------------------------------
+
+
+    def record(
+        self,
+        intent : str,
+        site_id : typing.Optional[str],
+        session_id : typing.Optional[str],
+        action : typing.Optional[str],
+        latency : float,
+        outcome : str,
+        speech : typing.Optional[str] = None
+    ):
+        """Queue record of a handled intent, never blocks."""
+        if self._queue is None:
+            return
+
+        try:
+            self._queue.put_nowait({
+                "timestamp" : time.time(),
+                "intent" : intent,
+                "site_id" : site_id,
+                "session_id" : session_id,
+                "action" : action,
+                "latency" : latency,
+                "outcome" : outcome,
+                "speech" : speech
+            })
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    # -------------------------------------------------------------------------
+
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._writer.open)
+
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._task = asyncio.ensure_future(self._run())
+
+    # -------------------------------------------------------------------------
+
+
+    async def stop(self):
+        """Write queued records and close audit log"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        # Batch being written when the task was cancelled
+        if self._pending_write is not None:
+            await self._pending_write
+            self._pending_write = None
+
+        if self._queue is not None:
+            await self._write_batch(self._take_batch(self._queue.qsize()), False)
+            self._queue = None
+
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._writer.close)
+
+        if self.dropped:
+            _LOGGER.warning("Audit log dropped %s record(s)", self.dropped)
+
+    # -------------------------------------------------------------------------
+
+
+    def _take_batch(self, size : int) -> typing.List[typing.Dict[str, typing.Any]]:
+        batch = []
+        while len(batch) < size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+
+        return batch
+
+    # -------------------------------------------------------------------------
+
+
+    def _write(self, batch : typing.List[typing.Dict[str, typing.Any]], expire : bool):
+        if batch:
+            self._writer.write(batch)
+
+        if expire:
+            self._writer.expire()
+
+    # -------------------------------------------------------------------------
+
+
+    async def _write_batch(self, batch : typing.List[typing.Dict[str, typing.Any]], expire : bool):
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(None, self._write, batch, expire)
+            self.written += len(batch)
+        except Exception as e:
+            _LOGGER.error(f"Audit log write of {len(batch)} record(s): " + str(e))
+
+    # -------------------------------------------------------------------------
+
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        next_expire = loop.time()
+        reported_dropped = 0
+
+        while True:
+            # Wait for first record, then take whatever else is queued. Wakes
+            # up for expiry even if idle, so retention holds without traffic.
+            try:
+                batch = [
+                    await asyncio.wait_for(self._queue.get(), max(0.0, next_expire - loop.time()))
+                ]
+            except asyncio.TimeoutError:
+                batch = []
+
+            batch.extend(self._take_batch(self.batch_size - len(batch)))
+
+            expire = loop.time() >= next_expire
+            if not (batch or expire):
+                continue
+
+            if expire:
+                next_expire = loop.time() + self.expire_interval
+
+            # Shielded, so stop() can wait for the batch instead of losing it
+            self._pending_write = asyncio.ensure_future(self._write_batch(batch, expire))
+            await asyncio.shield(self._pending_write)
+            self._pending_write = None
+
+            if self.dropped > reported_dropped:
+                _LOGGER.warning("Audit log queue full, dropped %s record(s)", self.dropped - reported_dropped)
+                reported_dropped = self.dropped
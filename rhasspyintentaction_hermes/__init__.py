@@ -1,7 +1,9 @@
 
 """Hermes MQTT server for script/remote-http/homeassistant actions"""
+import asyncio
 import logging
 import os
+import time
 import typing
 import json
 
@@ -15,7 +17,8 @@ from rhasspyhermes.handle import HandleToggleOff, HandleToggleOn
 from rhasspyhermes.nlu import NluIntent
 from rhasspyhermes.tts import TtsSay
 
-from .ActionManager import ActionManager
+from .ActionManager import ActionManager, Outcome
+from .AuditLog import AuditLog
 
 if "PYDEV_ACTIVE" in os.environ.keys():
     import sys
@@ -34,7 +37,11 @@ class IntentActionHermesMqtt(HermesClient):
     def __init__(
         self,
         client,
-        site_ids: typing.Optional[typing.List[str]] = None
+        site_ids: typing.Optional[typing.List[str]] = None,
+        action_load_timeout: typing.Optional[float] = 10.0,
+        max_subprocesses: typing.Optional[int] = None,
+        audit_log: typing.Optional[AuditLog] = None,
+        statistics_interval: typing.Optional[float] = 60.0
     ):
         super().__init__("rhasspyintentaction_hermes", client, site_ids=site_ids)
 
@@ -44,13 +51,22 @@ class IntentActionHermesMqtt(HermesClient):
         
         self.intend_map: typing.Dict[str, typing.Dict] = {}
         
-        self.action_manager = ActionManager()
+        self.action_manager = ActionManager(max_subprocesses)
         
-        self.load( )
+        self.audit_log = audit_log
+        
+        # Seconds between debug logs of waiting and running counts
+        self.statistics_interval = statistics_interval
+        
+        # Intents arriving during startup wait at most this long for their action
+        self.action_load_timeout = action_load_timeout
+        
+        self._intend_map_loaded: typing.Optional[asyncio.Event] = None
+        self._load_task: typing.Optional[asyncio.Future] = None
     # -------------------------------------------------------------------------
     
 
-    def load(self):
+    def read_intend_map(self):
         config_path = os.environ["RHASSPY_PROFILE_DIR"]
         
         used_action_names = set()
@@ -75,34 +91,176 @@ class IntentActionHermesMqtt(HermesClient):
                 used_action_names.add(action_name)
                 
         self.action_manager.set_used_action_names(used_action_names)
-        self.action_manager.prepare()
 
-        for intend_name, intend_def in self.intend_map.items():
-            intend_def["handler"] = self.action_manager.get_action_handler_instance(intend_def["action_name"])
-   
-# -------------------------------------------------------------------------
+    # -------------------------------------------------------------------------
+
+
+    @property
+    def intend_map_loaded(self) -> asyncio.Event:
+        """Get or create event set once the intent map was read"""
+        if self._intend_map_loaded is None:
+            self._intend_map_loaded = asyncio.Event()
+
+        return self._intend_map_loaded
+
+    # -------------------------------------------------------------------------
+
+
+    async def load_async(self):
+        """Load intent map and prepare actions without blocking message handling."""
+        loop = asyncio.get_running_loop()
+
+        try:
+            try:
+                await loop.run_in_executor(None, self.read_intend_map)
+            finally:
+                self.intend_map_loaded.set()
+
+            if not self.intend_map:
+                return
+
+            await self.action_manager.prepare_async()
+
+            for intend_name, intend_def in self.intend_map.items():
+                intend_def["action"] = self.action_manager.actions.get(intend_def["action_name"])
+
+            _LOGGER.debug("Loaded %s intent(s) and %s action(s)", len(self.intend_map), len(self.action_manager.actions))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            _LOGGER.exception("Loading actions: " + str(e))
+        finally:
+            # Intents waiting for an action that was never prepared fail fast
+            # instead of waiting out action_load_timeout
+            self.action_manager.repository_loaded.set()
+
+    # -------------------------------------------------------------------------
+
+
+    async def handle_messages_async(
+        self, loop: typing.Optional[asyncio.AbstractEventLoop] = None
+    ):
+        """Start loading actions in the background, then handle MQTT messages until stopped."""
+        if self.audit_log:
+            await self.audit_log.start()
+
+        self._load_task = asyncio.ensure_future(self.load_async())
+
+        statistics_task = None
+        if self.statistics_interval:
+            statistics_task = asyncio.ensure_future(self.log_statistics())
+
+        try:
+            await super().handle_messages_async(loop)
+        finally:
+            if statistics_task:
+                statistics_task.cancel()
+
+            self._load_task.cancel()
+            try:
+                await self._load_task
+            except asyncio.CancelledError:
+                pass
+
+            await self.action_manager.stop_async()
+
+            if self.audit_log:
+                await self.audit_log.stop()
+
+    # -------------------------------------------------------------------------
+
+
+    async def log_statistics(self):
+        """Periodically log waiting and running counts of actions and subprocesses."""
+        while True:
+            await asyncio.sleep(self.statistics_interval)
+            _LOGGER.debug("Action statistics: %s", json.dumps(self.action_manager.get_statistics()))
+
+    # -------------------------------------------------------------------------
+
+
+    async def get_intend_action(self, intend_map: typing.Dict[str, typing.Any]):
+        """Get action of intent map entry, waiting for a bounded time while actions are loading.
+
+        Raises asyncio.TimeoutError if the action is not ready in time.
+        """
+        if "action" in intend_map:
+            return intend_map["action"]
+
+        return await self.action_manager.wait_action(
+            intend_map["action_name"], self.action_load_timeout
+        )
+
+    # -------------------------------------------------------------------------
 
 
     async def dispatch_event(
         self, nlu_intent: NluIntent
     ) -> typing.AsyncIterable[TtsSay]:
+        start_time = time.perf_counter()
+
+        if not self.intend_map_loaded.is_set():
+            try:
+                await asyncio.wait_for(self.intend_map_loaded.wait(), self.action_load_timeout)
+            except asyncio.TimeoutError:
+                _LOGGER.warning("Intent map not loaded, dropping intent %s", nlu_intent.intent.intent_name)
+                self.audit(nlu_intent, None, start_time, Outcome.NOT_READY)
+                return
+
         intend_map = self.intend_map.get(nlu_intent.intent.intent_name)
         if not intend_map:
             intend_map = self.intend_map.get("")
+
+        action_name = intend_map["action_name"] if intend_map else None
             
-        if intend_map and intend_map["handler"]:
-            response_dict = await intend_map["handler"].handle_intent(nlu_intent)
+        try:
+            action = await self.get_intend_action(intend_map) if intend_map else None
+        except asyncio.TimeoutError:
+            self.audit(nlu_intent, action_name, start_time, Outcome.NOT_READY)
+            return
+
+        if not action:
+            self.audit(nlu_intent, action_name, start_time, Outcome.NO_ACTION)
+            return
+
+        outcome, response_dict = await action.handle_intent(nlu_intent)
             
-            if response_dict:
-                tts_text = response_dict.get("speech", {}).get("text", "")
-                if tts_text:
-                    # Forward to TTS system
-                    yield TtsSay(
-                        text=tts_text,
-                        id=str(uuid4()),
-                        site_id=nlu_intent.site_id,
-                        session_id=nlu_intent.session_id,
-                    )
+        tts_text = None
+        if response_dict:
+            tts_text = response_dict.get("speech", {}).get("text", "")
+
+        self.audit(nlu_intent, action.name, start_time, outcome, tts_text)
+
+        if tts_text:
+            # Forward to TTS system
+            yield TtsSay(
+                text=tts_text,
+                id=str(uuid4()),
+                site_id=nlu_intent.site_id,
+                session_id=nlu_intent.session_id,
+            )
+
+    # -------------------------------------------------------------------------
+
+
+    def audit(
+        self,
+        nlu_intent: NluIntent,
+        action_name: typing.Optional[str],
+        start_time: float,
+        outcome: str,
+        speech: typing.Optional[str] = None
+    ):
+        if self.audit_log:
+            self.audit_log.record(
+                nlu_intent.intent.intent_name,
+                nlu_intent.site_id,
+                nlu_intent.session_id,
+                action_name,
+                time.perf_counter() - start_time,
+                outcome,
+                speech
+            )
 
     # -------------------------------------------------------------------------
 
@@ -2,11 +2,13 @@
 import argparse
 import asyncio
 import logging
+import signal
 
 import paho.mqtt.client as mqtt
 import rhasspyhermes.cli as hermes_cli
 
 from . import IntentActionHermesMqtt
+from .AuditLog import AuditFormat, AuditLog
 
 _LOGGER = logging.getLogger("rhasspyintentaction_hermes")
 
@@ -17,26 +19,93 @@ def main():
     """Main method."""
     parser = argparse.ArgumentParser(prog="rhasspy-intentaction-hermes")
 
+    parser.add_argument(
+        "--action-load-timeout",
+        type=float,
+        default=10.0,
+        help="Seconds an intent waits for its action while actions are loading (default: 10)",
+    )
+
+    parser.add_argument(
+        "--max-subprocesses",
+        type=int,
+        help="Maximum number of concurrently running action commands (default: unlimited)",
+    )
+
+    parser.add_argument(
+        "--statistics-interval",
+        type=float,
+        default=60.0,
+        help="Seconds between debug logs of waiting and running intents per action, 0 to disable (default: 60)",
+    )
+    parser.add_argument(
+        "--audit-log",
+        help="Path of audit log recording every handled intent (default: disabled)",
+    )
+    parser.add_argument(
+        "--audit-format",
+        choices=[AuditFormat.SQLITE, AuditFormat.JSONL],
+        default=AuditFormat.SQLITE,
+        help="Format of audit log (default: sqlite)",
+    )
+    parser.add_argument(
+        "--audit-retention-days",
+        type=float,
+        help="Days audit records are kept (default: forever)",
+    )
+    parser.add_argument(
+        "--audit-queue-size",
+        type=int,
+        default=1000,
+        help="Records queued for writing before new ones are dropped (default: 1000)",
+    )
+
     hermes_cli.add_hermes_args(parser)
     args = parser.parse_args()
 
     hermes_cli.setup_logging(args)
     _LOGGER.debug(args)
 
+    audit_log = None
+    if args.audit_log:
+        audit_log = AuditLog(
+            args.audit_log,
+            audit_format=args.audit_format,
+            retention_days=args.audit_retention_days,
+            queue_size=args.audit_queue_size,
+        )
+
     # Listen for messages
     client = mqtt.Client()
     hermes = IntentActionHermesMqtt(
         client,
-        site_ids=args.site_id
+        site_ids=args.site_id,
+        action_load_timeout=args.action_load_timeout,
+        max_subprocesses=args.max_subprocesses,
+        audit_log=audit_log,
+        statistics_interval=args.statistics_interval
     )
 
     _LOGGER.debug("Connecting to %s:%s", args.host, args.port)
     hermes_cli.connect(client, args)
     client.loop_start()
 
+    async def run():
+        # SIGTERM cancels like Ctrl-C, so batches and audit records are flushed
+        task = asyncio.current_task()
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, task.cancel)
+        except NotImplementedError:
+            pass
+
+        try:
+            await hermes.handle_messages_async()
+        except asyncio.CancelledError:
+            pass
+
     try:
-        # Run event loop
-        asyncio.run(hermes.handle_messages_async())
+        # Run event loop, actions are loaded in the background
+        asyncio.run(run())
     except KeyboardInterrupt:
         pass
     finally:
@@ -0,0 +1 @@
+"""Intent handlers, imported by ActionManager only when an action uses them"""
@@ -0,0 +1,152 @@
+"""Micro-batched delivery of fire-and-forget requests"""
+import asyncio
+import logging
+import typing
+
+_LOGGER = logging.getLogger(__name__)
+
+# Delivers a batch, returns an error message or None for each item
+DeliverType = typing.Callable[
+    [typing.List[typing.Any]], typing.Awaitable[typing.List[typing.Optional[str]]]
+]
+
+
+def get_item_errors(response : typing.Any, count : int) -> typing.List[typing.Optional[str]]:
+    """Per-item errors of a batch endpoint response.
+
+    The response may be a list with one entry per item, where null, true or an
+    object without "error" means success. Items without an entry failed. Any
+    other response means all items were accepted.
+    """
+    if not isinstance(response, list):
+        return [None] * count
+
+    errors : typing.List[typing.Optional[str]] = []
+    for i in range(count):
+        if i >= len(response):
+            errors.append("no result")
+            continue
+
+        result = response[i]
+        if isinstance(result, dict):
+            errors.append(result.get("error"))
+        elif result is None or result is True:
+            errors.append(None)
+        else:
+            errors.append(str(result))
+
+    return errors
+
+# -----------------------------------------------------------------------------
+
+
+class MicroBatcher():
+    """Coalesces items added within window seconds, up to max_size, into one delivery.
+
+    At most max_in_flight deliveries run at a time, further batches wait for
+    one to finish. Items beyond max_queued waiting items, and items added
+    after stop(), are counted as failed.
+    """
+
+    def __init__(
+        self,
+        name : str,
+        deliver : DeliverType,
+        window : float = 0.05,
+        max_size : int = 50,
+        max_in_flight : int = 1,
+        max_queued : int = 1000
+    ):
+        self.name = name
+        self.window = window
+        self.max_size = max_size
+        self.max_in_flight = max_in_flight
+        self.max_queued = max_queued
+
+        self.delivered = 0
+        self.failed = 0
+
+        self._deliver = deliver
+        self._items : typing.List[typing.Any] = []
+        self._labels : typing.List[str] = []
+        self._timer : typing.Optional[asyncio.TimerHandle] = None
+        self._deliveries : typing.Set[asyncio.Future] = set()
+        self._stopped = False
+
+    # -------------------------------------------------------------------------
+
+
+    def add(self, item : typing.Any, label : str):
+        """Queue item for the next batch, label identifies it in failure reports."""
+        if self._stopped:
+            self.failed += 1
+            _LOGGER.error("%s: stopped, dropping %s", self.name, label)
+            return
+
+        if len(self._items) >= self.max_queued:
+            self.failed += 1
+            _LOGGER.error("%s: %s items waiting, dropping %s", self.name, len(self._items), label)
+            return
+
+        self._items.append(item)
+        self._labels.append(label)
+
+        if len(self._items) >= self.max_size:
+            self.flush()
+        elif self._timer is None and len(self._deliveries) < self.max_in_flight:
+            self._timer = asyncio.get_running_loop().call_later(self.window, self.flush)
+
+    # -------------------------------------------------------------------------
+
+
+    def flush(self):
+        """Start delivery of queued items, as far as max_in_flight allows"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        while self._items and len(self._deliveries) < self.max_in_flight:
+            items, self._items = self._items[:self.max_size], self._items[self.max_size:]
+            labels, self._labels = self._labels[:self.max_size], self._labels[self.max_size:]
+
+            delivery = asyncio.ensure_future(self._deliver_batch(items, labels))
+            self._deliveries.add(delivery)
+            delivery.add_done_callback(self._delivery_done)
+
+    # -------------------------------------------------------------------------
+
+
+    def _delivery_done(self, delivery : asyncio.Future):
+        self._deliveries.discard(delivery)
+
+        # Items held back while deliveries were running have waited long enough
+        self.flush()
+
+    # -------------------------------------------------------------------------
+
+
+    async def stop(self):
+        """Deliver outstanding items and wait for running deliveries"""
+        self._stopped = True
+
+        while self._items or self._deliveries:
+            self.flush()
+            await asyncio.gather(*self._deliveries, return_exceptions=True)
+
+    # -------------------------------------------------------------------------
+
+
+    async def _deliver_batch(self, items : typing.List[typing.Any], labels : typing.List[str]):
+        _LOGGER.debug("%s: delivering batch of %s", self.name, len(items))
+
+        try:
+            errors = await self._deliver(items)
+        except Exception as e:
+            errors = [str(e)] * len(items)
+
+        for label, error in zip(labels, errors):
+            if error:
+                self.failed += 1
+                _LOGGER.error("%s: delivery of %s failed: %s", self.name, label, error)
+            else:
+                self.delivered += 1
@@ -1,14 +1,11 @@
 """Hermes MQTT server for Rhasspy remote server"""
 import logging
 import typing
-import ssl
 import asyncio
 import json
 import os
-from uuid import uuid4
 
 from rhasspyhermes.nlu import NluIntent
-from rhasspyhermes.tts import TtsSay
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -66,46 +63,51 @@ class CommandIntendHandler():
     async def handle_intent(
         self, intent: NluIntent
     ) -> typing.Dict[str, typing.Any]:
-        """Handle intent with local command."""
+        """Handle intent with local command, raises if the command fails."""
         
         if not self._initialized:
             return
 
-        try:
-            if self.handle_command:
-                intent_json = json.dumps(intent.to_rhasspy_dict())
+        if not self.handle_command:
+            _LOGGER.warning("Can't handle intent. No handle command.")
+            return None
 
-                # Local handling command
-                _LOGGER.debug(self.handle_command)
-                
-                env = os.environ.copy() # for new Env-Varialbles
-
-                proc = await asyncio.create_subprocess_exec(
-                    self.handle_command,
-                    stdin=asyncio.subprocess.PIPE,
-                    stdout=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE,
-                    cwd=self._environment.self_directory,
-                    env=env,
-                )
-
-                output, error = await proc.communicate(intent_json.encode())
-                rc = proc.returncode
-
-                if error:
-                    _LOGGER.debug(error.decode())
-                
-                if rc == 0:
-                    try:
-                        response_dict = json.loads(output)
-                        return response_dict
-                    except Exception as e:
-                        _LOGGER.debug(str(e))
-                        
-            else:
-                _LOGGER.warning("Can't handle intent. No handle command.")
+        intent_json = json.dumps(intent.to_rhasspy_dict())
+
+        # Local handling command
+        _LOGGER.debug(self.handle_command)
+        
+        env = os.environ.copy() # for new Env-Varialbles
 
+        # Global cap on running processes
+        subprocess_limit = self._environment.subprocess_limit
+        await subprocess_limit.acquire()
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                self.handle_command,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                cwd=self._environment.self_directory,
+                env=env,
+            )
+
+            output, error = await proc.communicate(intent_json.encode())
+            rc = proc.returncode
+        finally:
+            subprocess_limit.release()
+
+        if error:
+            _LOGGER.debug(error.decode())
+        
+        if rc != 0:
+            raise RuntimeError(f"{self.handle_command} exited with {rc}")
+
+        try:
+            response_dict = json.loads(output)
+            return response_dict
         except Exception as e:
-            _LOGGER.exception("handle_intent: " + str(e))
+            # No (valid) response is not an error
+            _LOGGER.debug(str(e))
 
         return None
@@ -1,14 +1,15 @@
 """Hermes MQTT server for Rhasspy fuzzywuzzy"""
+import json
 import logging
-import ssl
 import typing
 import os
 from urllib.parse import urljoin
-from uuid import uuid4
 
-import aiohttp
 from rhasspyhermes.nlu import NluIntent
-from rhasspyhermes.tts import TtsSay
+
+from ..batcher import MicroBatcher, get_item_errors
+from ..http_connection import HttpConnection
+from .state_mirror import StateMirror
 
 # -----------------------------------------------------------------------------
 
@@ -36,7 +37,11 @@ class HomeAssistantIntendHandler():
         self._environment = environment
 
         # Async HTTP
-        self._http_session: typing.Optional[aiohttp.ClientSession] = None
+        self.connection: typing.Optional[HttpConnection] = None
+
+        self.state_mirror: typing.Optional[StateMirror] = None
+        self.batcher: typing.Optional[MicroBatcher] = None
+        self.query_templates: typing.Dict[str, str] = {}
         
     # -------------------------------------------------------------------------
 
@@ -61,28 +66,74 @@ class HomeAssistantIntendHandler():
         self.event_type_format = definition.get("event_type_format")
         self.handle_type       = definition.get("handle_type")
 
-        # SSL
-        certfile = definition.get("certfile")
-        keyfile  = definition.get("keyfile")
-
-        #ssl
-        self.ssl_context = ssl.SSLContext()
-        if certfile:
-            _LOGGER.debug("Using SSL with certfile=%s, keyfile=%s", certfile, keyfile)
-            self.ssl_context.load_cert_chain(certfile, keyfile)
+        # Pooled connection, SSL
+        self.connection = HttpConnection(definition)
+        self.ssl_context = self.connection.ssl_context
+
+        # Events are POSTed as list to batch_url
+        batch_url = definition.get("batch_url")
+        if batch_url and self.handle_type == HandleType.EVENT:
+            self.batch_url = urljoin(self.url, batch_url)
+            self.batcher = MicroBatcher(
+                self.batch_url,
+                self.post_event_batch,
+                window=definition.get("batch_window", 0.05),
+                max_size=definition.get("batch_max_size", 50),
+                max_in_flight=definition.get("batch_max_in_flight", 1)
+            )
+
+        # Local state mirror for answering query intents
+        mirror_entities = definition.get("mirror_entities")
+        if mirror_entities:
+            self.query_templates = definition.get("query_templates", {})
+            self.state_mirror = StateMirror(
+                self.url,
+                mirror_entities,
+                definition.get("mirror_max_age", 60.0),
+                self.get_hass_auth_message(),
+                self.get_hass_headers(),
+                self.ssl_context,
+                heartbeat=definition.get("mirror_heartbeat", 30.0)
+            )
             
         self._initialized = True
 
     # -------------------------------------------------------------------------
 
 
+    async def start(self):
+        """Start background tasks of handler"""
+        if not self._initialized:
+            return
+
+        await self.connection.start(
+            [urljoin(self.url, "api/")], "GET", self.get_hass_headers()
+        )
+
+        if self.state_mirror:
+            self.state_mirror.start(self.http_session)
+
+    # -------------------------------------------------------------------------
+
+
+    async def stop(self):
+        """Stop background tasks and close async HTTP session"""
+        if self.state_mirror:
+            await self.state_mirror.stop()
+
+        if self.batcher:
+            await self.batcher.stop()
+
+        if self.connection:
+            await self.connection.stop()
+
+    # -------------------------------------------------------------------------
+
+
     @property
     def http_session(self):
-        """Get or create async HTTP session"""
-        if self._http_session is None:
-            self._http_session = aiohttp.ClientSession()
-
-        return self._http_session
+        """Get async HTTP session"""
+        return self.connection.http_session
 
     # -------------------------------------------------------------------------
 
@@ -90,56 +141,102 @@ class HomeAssistantIntendHandler():
     async def handle_intent(
         self, intent: NluIntent
     ) -> typing.Dict[str, typing.Any]:
-        """Handle intent with Home Assistant."""
+        """Handle intent with Home Assistant, raises if Home Assistant fails."""
         
         if not self._initialized:
             return
         
+        response_dict = self.handle_query_intent(intent)
+        if response_dict:
+            return response_dict
+
+        if self.handle_type == HandleType.EVENT:
+            await self.handle_home_assistant_event(intent)
+
+        elif self.handle_type == HandleType.INTENT:
+            response_dict = await self.handle_home_assistant_intent(intent)
+            assert response_dict, f"No response from {self.url}"
+            return response_dict
+
+        else:
+            raise ValueError(f"Unsupported handle_type (got {self.handle_type})")
+
+    # -------------------------------------------------------------------------
+
+
+    def handle_query_intent(
+        self, intent: NluIntent
+    ) -> typing.Optional[typing.Dict[str, typing.Any]]:
+        """Answers intent from the local state mirror, None if remote handling is needed."""
+        template = self.query_templates.get(intent.intent.intent_name)
+        if not template or not self.state_mirror or not self.state_mirror.fresh:
+            return None
+
+        slots: typing.Dict[str, typing.Any] = {}
+        if intent.slots:
+            for slot in intent.slots:
+                slots[slot.slot_name] = slot.value["value"]
+
         try:
-            if self.handle_type == HandleType.EVENT:
-                await self.handle_home_assistant_event(intent)
-            
-            elif self.handle_type == HandleType.INTENT:
-                response_dict = await self.handle_home_assistant_intent(intent)
-                assert response_dict, f"No response from {self.url}"
+            text = template.format(states=self.state_mirror.states, slots=slots)
+        except (KeyError, IndexError, AttributeError, ValueError) as e:
+            _LOGGER.debug("Query %s not answered from state mirror: %s", intent.intent.intent_name, str(e))
+            return None
 
-            else:
-                raise ValueError(f"Unsupported handle_type (got {self.handle_type})")
-        except Exception as e:
-            _LOGGER.exception("handle_intent: " + e)
+        return {"speech": {"text": text}}
 
     # -------------------------------------------------------------------------
 
 
     async def handle_home_assistant_event(self, intent: NluIntent):
         """POSTs an event to Home Assistant's /api/events endpoint."""
-        try:
-            # Create new Home Assistant event
-            event_type = self.event_type_format.format(intent.intent.intent_name)
-            slots: typing.Dict[str, typing.Any] = {}
-
-            if intent.slots:
-                for slot in intent.slots:
-                    slots[slot.slot_name] = slot.value["value"]
-
-            # Add meta slots
-            slots["_text"] = intent.input
-            slots["_raw_text"] = intent.raw_input
-            slots["_intent"] = intent.to_dict()
-
-            # Send event
-            post_url = urljoin(self.url, "api/events/" + event_type)
-            headers = self.get_hass_headers()
-
-            _LOGGER.debug(post_url)
-
-            # No response expected
-            async with self.http_session.post(
-                post_url, json=slots, headers=headers, ssl=self.ssl_context
-            ) as response:
-                response.raise_for_status()
-        except Exception as e:
-            _LOGGER.exception("handle_home_assistant_event: " + e)
+        # Create new Home Assistant event
+        event_type = self.event_type_format.format(intent.intent.intent_name)
+        slots: typing.Dict[str, typing.Any] = {}
+
+        if intent.slots:
+            for slot in intent.slots:
+                slots[slot.slot_name] = slot.value["value"]
+
+        # Add meta slots
+        slots["_text"] = intent.input
+        slots["_raw_text"] = intent.raw_input
+        slots["_intent"] = intent.to_dict()
+
+        if self.batcher:
+            # Delivered with next batch
+            self.batcher.add({"event_type": event_type, "data": slots}, event_type)
+            return
+
+        # Send event
+        post_url = urljoin(self.url, "api/events/" + event_type)
+        headers = self.get_hass_headers()
+
+        _LOGGER.debug(post_url)
+
+        # No response expected
+        async with self.http_session.post(
+            post_url, json=slots, headers=headers, ssl=self.ssl_context
+        ) as response:
+            response.raise_for_status()
+
+    # -------------------------------------------------------------------------
+
+
+    async def post_event_batch(
+        self, events: typing.List[typing.Dict[str, typing.Any]]
+    ) -> typing.List[typing.Optional[str]]:
+        """POSTs a list of events to batch_url, returns per-item errors."""
+        async with self.http_session.post(
+            self.batch_url, json=events, headers=self.get_hass_headers(), ssl=self.ssl_context
+        ) as response:
+            response.raise_for_status()
+            try:
+                response_json = await response.json(content_type=None)
+            except ValueError:
+                response_json = None
+
+        return get_item_errors(response_json, len(events))
 
     # -------------------------------------------------------------------------
 
@@ -148,37 +245,31 @@ class HomeAssistantIntendHandler():
         self, intent: NluIntent
     ) -> typing.Dict[str, typing.Any]:
         """POSTs a JSON intent to Home Assistant's /api/intent/handle endpoint."""
-        try:
-            slots: typing.Dict[str, typing.Any] = {}
-
-            if intent.slots:
-                for slot in intent.slots:
-                    slots[slot.slot_name] = slot.value["value"]
+        slots: typing.Dict[str, typing.Any] = {}
 
-            # Add meta slots
-            slots["_text"] = intent.input
-            slots["_raw_text"] = intent.raw_input
-            slots["_intent"] = intent.to_dict()
+        if intent.slots:
+            for slot in intent.slots:
+                slots[slot.slot_name] = slot.value["value"]
 
-            hass_intent = {"name": intent.intent.intent_name, "data": slots}
+        # Add meta slots
+        slots["_text"] = intent.input
+        slots["_raw_text"] = intent.raw_input
+        slots["_intent"] = intent.to_dict()
 
-            # POST intent JSON
-            post_url = urljoin(self.url, "api/intent/handle")
-            headers = self.get_hass_headers()
+        hass_intent = {"name": intent.intent.intent_name, "data": slots}
 
-            _LOGGER.debug(post_url)
+        # POST intent JSON
+        post_url = urljoin(self.url, "api/intent/handle")
+        headers = self.get_hass_headers()
 
-            # JSON response expected with optional speech
-            async with self.http_session.post(
-                post_url, json=hass_intent, headers=headers, ssl=self.ssl_context
-            ) as response:
-                response.raise_for_status()
-                return await response.json()
-        except Exception as e:
-            _LOGGER.exception("handle_home_assistant_intent: " + str(e))
+        _LOGGER.debug(post_url)
 
-        # Empty response
-        return {}
+        # JSON response expected with optional speech
+        async with self.http_session.post(
+            post_url, json=hass_intent, headers=headers, ssl=self.ssl_context
+        ) as response:
+            response.raise_for_status()
+            return await response.json()
 
     # -------------------------------------------------------------------------
 
@@ -198,4 +289,14 @@ class HomeAssistantIntendHandler():
         # No headers
         return {}
 
+    # -------------------------------------------------------------------------
+
+
+    def get_hass_auth_message(self) -> typing.Dict[str, str]:
+        """Gets authentication message for Home Assistant websocket API."""
+        if self.api_password and not self.access_token:
+            return {"type": "auth", "api_password": self.api_password}
+
+        return {"type": "auth", "access_token": self.access_token or os.environ.get("HASSIO_TOKEN", "")}
+
     # -------------------------------------------------------------------------
\ No newline at end of file
@@ -0,0 +1,168 @@
+"""Local mirror of selected Home Assistant entity states"""
+import asyncio
+import logging
+import typing
+from urllib.parse import urljoin
+
+import aiohttp
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class StateMirror():
+    """Keeps selected entity states current via the Home Assistant websocket API.
+
+    States are bulk loaded from /api/states after subscribing to state_changed
+    events, so no change is lost between load and subscription. The websocket
+    is pinged every heartbeat seconds, so a half-open connection is detected
+    and the mirror turns stale after max_age.
+    """
+
+    def __init__(
+        self,
+        url : str,
+        entity_ids : typing.Iterable[str],
+        max_age : float,
+        auth_message : typing.Dict[str, str],
+        headers : typing.Dict[str, str],
+        ssl_context,
+        heartbeat : float = 30.0,
+        reconnect_delay : float = 5.0
+    ):
+        self.url = url
+        self.entity_ids = set(entity_ids)
+        self.max_age = max_age
+        self.heartbeat = heartbeat
+        self.reconnect_delay = reconnect_delay
+
+        self._auth_message = auth_message
+        self._headers = headers
+        self._ssl_context = ssl_context
+
+        self.states : typing.Dict[str, typing.Dict[str, typing.Any]] = {}
+
+        self._connected = False
+        self._synced_at : typing.Optional[float] = None
+        self._task : typing.Optional[asyncio.Future] = None
+
+    # -------------------------------------------------------------------------
+
+
+    @property
+    def fresh(self) -> bool:
+        """True while subscribed or if the last sync is not older than max_age"""
+        if self._connected:
+            return True
+
+        if self._synced_at is None:
+            return False
+
+        return asyncio.get_running_loop().time() - self._synced_at <= self.max_age
+
+    # -------------------------------------------------------------------------
+
+
+    def start(self, http_session : aiohttp.ClientSession):
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run(http_session))
+
+    # -------------------------------------------------------------------------
+
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        self._connected = False
+
+    # -------------------------------------------------------------------------
+
+
+    async def _run(self, http_session : aiohttp.ClientSession):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            try:
+                await self._sync(http_session)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                _LOGGER.warning("State mirror of %s: %s", self.url, str(e))
+
+            if self._connected:
+                # Mirror stays valid for max_age after losing the subscription
+                self._connected = False
+                self._synced_at = loop.time()
+
+            await asyncio.sleep(self.reconnect_delay)
+
+    # -------------------------------------------------------------------------
+
+
+    async def _sync(self, http_session : aiohttp.ClientSession):
+        loop = asyncio.get_running_loop()
+
+        async with http_session.ws_connect(
+            urljoin(self.url, "api/websocket"), ssl=self._ssl_context, heartbeat=self.heartbeat
+        ) as ws:
+            message = await ws.receive_json()
+            if message.get("type") == "auth_required":
+                await ws.send_json(self._auth_message)
+                message = await ws.receive_json()
+
+            if message.get("type") != "auth_ok":
+                raise ConnectionError(f"Authentication failed (got {message.get('type')})")
+
+            await ws.send_json({"id": 1, "type": "subscribe_events", "event_type": "state_changed"})
+            message = await ws.receive_json()
+            if not message.get("success"):
+                raise ConnectionError(f"Subscription failed (got {message})")
+
+            await self._load_states(http_session)
+
+            self._connected = True
+            self._synced_at = loop.time()
+            _LOGGER.debug("State mirror of %s: %s entities", self.url, len(self.states))
+
+            async for msg in ws:
+                if msg.type != aiohttp.WSMsgType.TEXT:
+                    break
+
+                self._update_state(msg.json())
+
+    # -------------------------------------------------------------------------
+
+
+    async def _load_states(self, http_session : aiohttp.ClientSession):
+        async with http_session.get(
+            urljoin(self.url, "api/states"), headers=self._headers, ssl=self._ssl_context
+        ) as response:
+            response.raise_for_status()
+            states = await response.json()
+
+        self.states = {
+            state["entity_id"] : state for state in states if state.get("entity_id") in self.entity_ids
+        }
+
+    # -------------------------------------------------------------------------
+
+
+    def _update_state(self, message : typing.Dict[str, typing.Any]):
+        if message.get("type") != "event":
+            return
+
+        data = message.get("event", {}).get("data", {})
+        entity_id = data.get("entity_id")
+        if entity_id not in self.entity_ids:
+            return
+
+        new_state = data.get("new_state")
+        if new_state:
+            self.states[entity_id] = new_state
+        else:
+            self.states.pop(entity_id, None)
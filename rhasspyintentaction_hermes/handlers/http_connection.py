@@ -0,0 +1,154 @@
+"""Pooled HTTP connection to a remote backend"""
+import asyncio
+import logging
+import ssl
+import threading
+import typing
+
+import aiohttp
+
+_LOGGER = logging.getLogger(__name__)
+
+# SSL contexts by (certfile, keyfile), shared so certificates are loaded once.
+# TLS sessions are not resumed, handshakes are only saved by pooled,
+# kept-alive connections.
+_ssl_contexts: typing.Dict[typing.Tuple[typing.Optional[str], typing.Optional[str]], ssl.SSLContext] = {}
+
+# Handlers are initialized concurrently in executor threads
+_ssl_contexts_lock = threading.Lock()
+
+
+def get_ssl_context(certfile : typing.Optional[str], keyfile : typing.Optional[str]) -> ssl.SSLContext:
+    key = (certfile, keyfile)
+    with _ssl_contexts_lock:
+        ssl_context = _ssl_contexts.get(key)
+        if ssl_context is None:
+            ssl_context = ssl.SSLContext()
+            if certfile:
+                _LOGGER.debug("Using SSL with certfile=%s, keyfile=%s", certfile, keyfile)
+                ssl_context.load_cert_chain(certfile, keyfile)
+
+            _ssl_contexts[key] = ssl_context
+
+    return ssl_context
+
+# -----------------------------------------------------------------------------
+
+
+class HttpConnection():
+    """Async HTTP session with optional warm-up and keep-alive pings.
+
+    Definition keys (all optional):
+    * warmup             - open connections at startup (default: false)
+    * keepalive_interval - seconds between pings keeping pooled connections open
+    * dns_cache_ttl      - seconds resolved addresses are cached (default: 10)
+    * ping_timeout       - seconds before a warm-up or keep-alive ping is abandoned (default: 5)
+    """
+
+    def __init__(
+        self,
+        definition : typing.Dict[str, typing.Any]
+    ):
+        self.ssl_context = get_ssl_context(definition.get("certfile"), definition.get("keyfile"))
+
+        self.warmup = definition.get("warmup", False)
+        self.keepalive_interval = definition.get("keepalive_interval")
+        self.dns_cache_ttl = definition.get("dns_cache_ttl", 10)
+        self.ping_timeout = aiohttp.ClientTimeout(total=definition.get("ping_timeout", 5.0))
+
+        self._http_session: typing.Optional[aiohttp.ClientSession] = None
+        self._keepalive_task: typing.Optional[asyncio.Future] = None
+
+    # -------------------------------------------------------------------------
+
+
+    @property
+    def http_session(self) -> aiohttp.ClientSession:
+        """Get or create async HTTP session"""
+        if self._http_session is None:
+            connector_args = {"ttl_dns_cache" : self.dns_cache_ttl}
+            if self.keepalive_interval:
+                # Pings must arrive before pooled connections are closed
+                connector_args["keepalive_timeout"] = self.keepalive_interval * 2
+
+            self._http_session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(**connector_args)
+            )
+
+        return self._http_session
+
+    # -------------------------------------------------------------------------
+
+
+    async def start(
+        self,
+        ping_urls : typing.List[str],
+        method : str = "HEAD",
+        headers : typing.Optional[typing.Dict[str, str]] = None
+    ):
+        """Warm up connections and start keep-alive pings if configured."""
+        if self.warmup:
+            await self.ping_all(ping_urls, method, headers)
+
+        if self.keepalive_interval and self._keepalive_task is None:
+            self._keepalive_task = asyncio.ensure_future(
+                self._keepalive(ping_urls, method, headers)
+            )
+
+    # -------------------------------------------------------------------------
+
+
+    async def stop(self):
+        if self._keepalive_task is not None:
+            self._keepalive_task.cancel()
+            try:
+                await self._keepalive_task
+            except asyncio.CancelledError:
+                pass
+            self._keepalive_task = None
+
+        if self._http_session is not None:
+            await self._http_session.close()
+            self._http_session = None
+
+    # -------------------------------------------------------------------------
+
+
+    async def ping(
+        self,
+        url : str,
+        method : str = "HEAD",
+        headers : typing.Optional[typing.Dict[str, str]] = None
+    ):
+        """Request url ignoring the response, leaves a warm connection in the pool."""
+        try:
+            async with self.http_session.request(
+                method, url, headers=headers, ssl=self.ssl_context, timeout=self.ping_timeout
+            ) as response:
+                await response.read()
+        except Exception as e:
+            _LOGGER.debug("Ping %s: %s", url, str(e))
+
+    # -------------------------------------------------------------------------
+
+
+    async def ping_all(
+        self,
+        urls : typing.List[str],
+        method : str = "HEAD",
+        headers : typing.Optional[typing.Dict[str, str]] = None
+    ):
+        await asyncio.gather(*[self.ping(url, method, headers) for url in urls])
+
+    # -------------------------------------------------------------------------
+
+
+    async def _keepalive(
+        self,
+        urls : typing.List[str],
+        method : str,
+        headers : typing.Optional[typing.Dict[str, str]]
+    ):
+        while True:
+            await asyncio.sleep(self.keepalive_interval)
+            await self.ping_all(urls, method, headers)
@@ -1,15 +1,15 @@
 """Hermes MQTT server for Rhasspy remote server"""
+import asyncio
 import json
 import logging
-import ssl
 import typing
 import os
-from uuid import uuid4
 
-import aiohttp
 from rhasspyhermes.nlu import NluIntent
-from rhasspyhermes.tts import TtsSay
-from multiprocessing.util import _logger
+
+from ..batcher import MicroBatcher, get_item_errors
+from ..http_connection import HttpConnection
+from .balancer import Endpoint, LoadBalancer, Strategy
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -23,7 +23,10 @@ class RemoteHttpIntendHandler():
         self._environment = environment
         
         # Async HTTP
-        self._http_session: typing.Optional[aiohttp.ClientSession] = None
+        self.connection: typing.Optional[HttpConnection] = None
+        
+        # Fire-and-forget delivery in batches
+        self.batcher: typing.Optional[MicroBatcher] = None
 
 # -----------------------------------------------------------------------------
 
@@ -41,30 +44,69 @@ class RemoteHttpIntendHandler():
         if not definition:
             return 
         
+        # Single URL or list of replicas
         self.handle_url = definition.get("handle_url")
+        handle_urls = self.handle_url if isinstance(self.handle_url, list) else [self.handle_url]
+        handle_urls = [url for url in handle_urls if url]
+
+        # Intents are POSTed as list to batch_url, no response expected
+        self.batch_url = definition.get("batch_url")
+        if self.batch_url:
+            self.batcher = MicroBatcher(
+                self.batch_url,
+                self.post_batch,
+                window=definition.get("batch_window", 0.05),
+                max_size=definition.get("batch_max_size", 50),
+                max_in_flight=definition.get("batch_max_in_flight", 1)
+            )
+
+        keepalive_url = definition.get("keepalive_url")
+        self.keepalive_urls = [keepalive_url] if keepalive_url else (handle_urls or [self.batch_url])
 
-        # SSL
-        certfile = definition.get("certfile")
-        keyfile  = definition.get("keyfile")
+        try:
+            self.balancer = LoadBalancer(
+                handle_urls,
+                strategy=definition.get("balance", Strategy.ROUND_ROBIN),
+                ewma_decay=definition.get("ewma_decay", 0.3),
+                eject_after_failures=definition.get("eject_after_failures", 3),
+                eject_seconds=definition.get("eject_seconds", 30.0),
+                hedge_delay=definition.get("hedge_delay")
+            )
+        except ValueError as e:
+            _LOGGER.error(f"Error in definition {def_file_name}: " + str(e))
+            return
 
-        self.ssl_context = ssl.SSLContext()
-        
-        if certfile:
-            _LOGGER.debug("Using SSL with certfile=%s, keyfile=%s", certfile, keyfile)
-            self.ssl_context.load_cert_chain(certfile, keyfile)
+        # Pooled connection, SSL
+        self.connection = HttpConnection(definition)
+        self.ssl_context = self.connection.ssl_context
             
         self._initialized = True
 
 # -----------------------------------------------------------------------------
 
 
+    async def start(self):
+        """Warm up connections to remote servers"""
+        if self._initialized and self.keepalive_urls:
+            await self.connection.start(self.keepalive_urls)
+
+# -----------------------------------------------------------------------------
+
+
+    async def stop(self):
+        if self.batcher:
+            await self.batcher.stop()
+
+        if self.connection:
+            await self.connection.stop()
+
+# -----------------------------------------------------------------------------
+
+
     @property
     def http_session(self):
-        """Get or create async HTTP session"""
-        if self._http_session is None:
-            self._http_session = aiohttp.ClientSession()
-
-        return self._http_session
+        """Get async HTTP session"""
+        return self.connection.http_session
 
 # -----------------------------------------------------------------------------
 
@@ -72,31 +114,116 @@ class RemoteHttpIntendHandler():
     async def handle_intent(
         self, intent: NluIntent
     ) -> typing.Dict[str, typing.Any]:
-        """Handle intent with remote server or local command."""
+        """Handle intent with remote server, raises if the server fails."""
         
         if not self._initialized:
             return
         
+        intent_dict = intent.to_rhasspy_dict()
+
+        # Add site_id
+        intent_dict["site_id"] = intent.site_id
+
+        if self.batcher:
+            # Delivered with next batch
+            self.batcher.add(intent_dict, intent.intent.intent_name)
+
+        elif self.balancer.endpoints:
+            # Remote server
+            response_dict = await self.post_balanced(intent_dict)
+
+            # Check for speech response
+            return response_dict
+        else:
+            _LOGGER.warning("Can't handle intent. No handle URL.")
+
+# -----------------------------------------------------------------------------
+
+
+    async def post_intent(
+        self,
+        endpoint : Endpoint,
+        intent_dict : typing.Dict[str, typing.Any]
+    ) -> typing.Dict[str, typing.Any]:
+        """POSTs intent to a single endpoint and records its latency or failure."""
+        _LOGGER.debug(endpoint.url)
+
+        loop = asyncio.get_running_loop()
+        start_time = loop.time()
+
+        endpoint.in_flight += 1
         try:
-            intent_dict = intent.to_rhasspy_dict()
+            async with self.http_session.post(
+                endpoint.url, json=intent_dict, ssl=self.ssl_context
+            ) as response:
+                response.raise_for_status()
+                response_dict = await response.json()
+        except asyncio.CancelledError:
+            # Lost against a hedged request
+            self.balancer.record_cancelled(endpoint, loop.time() - start_time)
+            raise
+        except Exception:
+            self.balancer.record_failure(endpoint, loop.time() - start_time)
+            raise
+        finally:
+            endpoint.in_flight -= 1
+
+        self.balancer.record_success(endpoint, loop.time() - start_time)
+        return response_dict
 
-            # Add site_id
-            intent_dict["site_id"] = intent.site_id
+# -----------------------------------------------------------------------------
 
-            if self.handle_url:
-                # Remote server
-                _LOGGER.debug(self.handle_url)
 
-                async with self.http_session.post(
-                    self.handle_url, json=intent_dict, ssl=self.ssl_context
-                ) as response:
-                    response.raise_for_status()
-                    response_dict = await response.json()
+    async def post_balanced(
+        self,
+        intent_dict : typing.Dict[str, typing.Any]
+    ) -> typing.Dict[str, typing.Any]:
+        """POSTs intent to a selected endpoint, hedged with a second one if it is slow."""
+        primary = self.balancer.select()
+        hedge_delay = self.balancer.get_hedge_delay()
 
-                # Check for speech response
-                return response_dict
-            else:
-                _LOGGER.warning("Can't handle intent. No handle URL.")
+        if hedge_delay is None or len(self.balancer.endpoints) < 2:
+            return await self.post_intent(primary, intent_dict)
 
-        except Exception as e:
-            _LOGGER.exception("handle_intent: " + str(e) )
+        pending = {asyncio.ensure_future(self.post_intent(primary, intent_dict))}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=hedge_delay)
+
+            # Primary is slow or failed, send copy to another endpoint
+            if not done or next(iter(done)).exception():
+                secondary = self.balancer.select(exclude=(primary,))
+                _LOGGER.debug("Hedging request to %s", secondary.url)
+                pending.add(asyncio.ensure_future(self.post_intent(secondary, intent_dict)))
+
+            while True:
+                for task in done:
+                    if not task.exception():
+                        return task.result()
+
+                if not pending:
+                    # All failed, raise last error
+                    return next(iter(done)).result()
+
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in pending:
+                task.cancel()
+
+# -----------------------------------------------------------------------------
+
+
+    async def post_batch(
+        self,
+        intent_dicts : typing.List[typing.Dict[str, typing.Any]]
+    ) -> typing.List[typing.Optional[str]]:
+        """POSTs a list of intents to batch_url, returns per-item errors."""
+        async with self.http_session.post(
+            self.batch_url, json=intent_dicts, ssl=self.ssl_context
+        ) as response:
+            response.raise_for_status()
+            try:
+                response_json = await response.json(content_type=None)
+            except ValueError:
+                response_json = None
+
+        return get_item_errors(response_json, len(intent_dicts))
@@ -0,0 +1,190 @@
+"""Latency aware selection of remote endpoints"""
+import collections
+import logging
+import math
+import time
+import typing
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class Strategy():
+    """Method for selecting an endpoint."""
+
+    ROUND_ROBIN = "round_robin"
+    LEAST_IN_FLIGHT = "least_in_flight"
+    EWMA = "ewma"
+    HEDGED = "hedged"
+
+
+# -----------------------------------------------------------------------------
+
+
+class Endpoint():
+    def __init__(
+        self,
+        url : str,
+        window : int
+    ):
+        self.url = url
+        self.in_flight = 0
+        self.ewma : typing.Optional[float] = None
+        self.failures = 0
+        self.ejected_until = 0.0
+        self.latencies : typing.Deque[float] = collections.deque(maxlen=window)
+
+    def score(self) -> float:
+        """Expected latency, unmeasured endpoints are probed first"""
+        return (self.ewma or 0.0) * (self.in_flight + 1)
+
+
+# -----------------------------------------------------------------------------
+
+
+class LoadBalancer():
+    """Selects endpoints and tracks their latency and health passively.
+
+    An endpoint failing eject_after_failures times in a row is skipped for
+    eject_seconds, then probed again with a fresh EWMA. If all endpoints are
+    ejected, all are used again. Failures
+    and requests lost against a hedged copy count as failure_penalty seconds
+    of extra latency in the EWMA.
+    """
+
+    def __init__(
+        self,
+        urls : typing.Iterable[str],
+        strategy : str = Strategy.ROUND_ROBIN,
+        ewma_decay : float = 0.3,
+        eject_after_failures : int = 3,
+        eject_seconds : float = 30.0,
+        failure_penalty : float = 1.0,
+        hedge_delay : typing.Optional[float] = None,
+        hedge_min_samples : int = 20,
+        window : int = 100
+    ):
+        self.endpoints = [Endpoint(url, window) for url in urls]
+        self.strategy = strategy
+        self.ewma_decay = ewma_decay
+        self.eject_after_failures = eject_after_failures
+        self.eject_seconds = eject_seconds
+        self.failure_penalty = failure_penalty
+        self.hedge_delay = hedge_delay
+        self.hedge_min_samples = hedge_min_samples
+
+        self._next = 0
+
+        if strategy not in (Strategy.ROUND_ROBIN, Strategy.LEAST_IN_FLIGHT, Strategy.EWMA, Strategy.HEDGED):
+            raise ValueError(f"Unsupported strategy (got {strategy})")
+
+    # -------------------------------------------------------------------------
+
+
+    def available(
+        self,
+        exclude : typing.Container[Endpoint] = ()
+    ) -> typing.List[Endpoint]:
+        now = time.monotonic()
+        endpoints = [e for e in self.endpoints if e not in exclude]
+        healthy = [e for e in endpoints if e.ejected_until <= now]
+
+        for e in healthy:
+            if e.ejected_until:
+                # Back from ejection, forget the penalized EWMA so it is probed again
+                _LOGGER.info("Returning %s to rotation", e.url)
+                e.ejected_until = 0.0
+                e.ewma = None
+
+        return healthy or endpoints
+
+    # -------------------------------------------------------------------------
+
+
+    def select(
+        self,
+        exclude : typing.Container[Endpoint] = ()
+    ) -> typing.Optional[Endpoint]:
+        endpoints = self.available(exclude)
+        if not endpoints:
+            return None
+
+        self._next += 1
+
+        if self.strategy == Strategy.ROUND_ROBIN:
+            return endpoints[self._next % len(endpoints)]
+
+        if self.strategy == Strategy.LEAST_IN_FLIGHT:
+            scores = [e.in_flight for e in endpoints]
+        else:
+            scores = [e.score() for e in endpoints]
+
+        # Rotate over tied endpoints only, so ties share load evenly
+        best = min(scores)
+        ties = [e for e, score in zip(endpoints, scores) if score == best]
+
+        return ties[self._next % len(ties)]
+
+    # -------------------------------------------------------------------------
+
+
+    def get_hedge_delay(self) -> typing.Optional[float]:
+        """Seconds before a hedged request is sent, p95 of recent latencies"""
+        if self.strategy != Strategy.HEDGED:
+            return None
+
+        latencies = sorted(l for e in self.endpoints for l in e.latencies)
+        if len(latencies) < self.hedge_min_samples:
+            return self.hedge_delay
+
+        return latencies[math.ceil(0.95 * len(latencies)) - 1]
+
+    # -------------------------------------------------------------------------
+
+
+    def update_ewma(self, endpoint : Endpoint, latency : float):
+        if endpoint.ewma is None:
+            endpoint.ewma = latency
+        else:
+            endpoint.ewma += self.ewma_decay * (latency - endpoint.ewma)
+
+    # -------------------------------------------------------------------------
+
+
+    def record_success(self, endpoint : Endpoint, latency : float):
+        endpoint.failures = 0
+        endpoint.latencies.append(latency)
+        self.update_ewma(endpoint, latency)
+
+    # -------------------------------------------------------------------------
+
+
+    def record_failure(self, endpoint : Endpoint, latency : float):
+        endpoint.failures += 1
+        self.update_ewma(endpoint, latency + self.failure_penalty)
+
+        if endpoint.failures >= self.eject_after_failures:
+            _LOGGER.warning("Ejecting %s for %s seconds after %s failures", endpoint.url, self.eject_seconds, endpoint.failures)
+            endpoint.ejected_until = time.monotonic() + self.eject_seconds
+            endpoint.failures = 0
+
+    # -------------------------------------------------------------------------
+
+
+    def record_cancelled(self, endpoint : Endpoint, latency : float):
+        """Request lost against a hedged copy, elapsed time is only a lower bound"""
+        self.update_ewma(endpoint, latency + self.failure_penalty)
+
+    # -------------------------------------------------------------------------
+
+
+    def get_statistics(self) -> typing.List[typing.Dict[str, typing.Any]]:
+        now = time.monotonic()
+        return [
+            {
+                "url" : e.url,
+                "in_flight" : e.in_flight,
+                "ewma" : e.ewma,
+                "ejected" : e.ejected_until > now
+            }
+            for e in self.endpoints
+        ]
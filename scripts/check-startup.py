@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""Benchmark import time, startup time and resident memory against a budget.
+
+Uses a temporary profile with a single buildin.command action. Each
+measurement runs in a fresh interpreter; the median of all runs is compared
+against the budget. Exits with 1 if any budget is exceeded.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Modules a command-only profile must not load
+_LAZY_MODULES = ["aiohttp", "sqlite3"]
+
+# Runs in a fresh interpreter, prints measurements as JSON
+_CHILD = """
+import json, resource, sys, time
+start = time.perf_counter()
+import rhasspyintentaction_hermes.__main__
+import_seconds = time.perf_counter() - start
+
+import asyncio
+import paho.mqtt.client as mqtt
+from rhasspyintentaction_hermes import IntentActionHermesMqtt
+
+start = time.perf_counter()
+hermes = IntentActionHermesMqtt(mqtt.Client())
+asyncio.run(hermes.load_async())
+load_seconds = time.perf_counter() - start
+
+assert hermes.action_manager.get_action_handler_instance("command"), "Action not loaded"
+
+# Kilobytes on Linux, bytes on macOS
+max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+if sys.platform == "darwin":
+    max_rss //= 1024
+
+print(json.dumps({
+    "import_seconds": import_seconds,
+    "load_seconds": load_seconds,
+    "max_rss_mb": max_rss / 1024,
+    "loaded_lazy_modules": [m for m in %r if m in sys.modules],
+}))
+""" % (
+    _LAZY_MODULES,
+)
+
+# -----------------------------------------------------------------------------
+
+
+def create_profile(profile_dir: str):
+    action_dir = os.path.join(profile_dir, "actions", "command")
+    os.makedirs(action_dir)
+
+    with open(os.path.join(profile_dir, "intent_map.json"), "w") as map_file:
+        json.dump({"": {"action": "command"}}, map_file)
+
+    with open(os.path.join(action_dir, "manifest.json"), "w") as manifest_file:
+        json.dump({"type": "buildin.command"}, manifest_file)
+
+    with open(os.path.join(action_dir, "def.json"), "w") as def_file:
+        json.dump({"command": "./handle.sh"}, def_file)
+
+
+def run_child(src_dir: str, env: dict) -> dict:
+    output = subprocess.check_output(
+        [sys.executable, "-c", _CHILD], cwd=src_dir, env=env
+    )
+    return json.loads(output)
+
+
+def run_help(src_dir: str, env: dict) -> float:
+    """Wall time of python -m rhasspyintentaction_hermes up to argument parsing"""
+    start = time.perf_counter()
+    subprocess.check_call(
+        [sys.executable, "-m", "rhasspyintentaction_hermes", "--help"],
+        cwd=src_dir,
+        env=env,
+        stdout=subprocess.DEVNULL,
+    )
+    return time.perf_counter() - start
+
+
+# -----------------------------------------------------------------------------
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="check-startup")
+    parser.add_argument("--runs", type=int, default=5, help="Number of runs")
+    parser.add_argument(
+        "--max-import-seconds",
+        type=float,
+        default=1.0,
+        help="Budget for importing rhasspyintentaction_hermes.__main__",
+    )
+    parser.add_argument(
+        "--max-load-seconds",
+        type=float,
+        default=0.5,
+        help="Budget for loading intent map and actions",
+    )
+    parser.add_argument(
+        "--max-startup-seconds",
+        type=float,
+        default=2.0,
+        help="Budget for python -m rhasspyintentaction_hermes --help",
+    )
+    parser.add_argument(
+        "--max-rss-mb", type=float, default=60.0, help="Budget for peak resident memory"
+    )
+    args = parser.parse_args()
+
+    src_dir = os.path.realpath(os.path.join(os.path.dirname(__file__), ".."))
+
+    with tempfile.TemporaryDirectory() as profile_dir:
+        create_profile(profile_dir)
+
+        env = dict(os.environ)
+        env["RHASSPY_PROFILE_DIR"] = profile_dir
+        env["PYTHONPATH"] = os.pathsep.join(
+            p for p in [src_dir, env.get("PYTHONPATH")] if p
+        )
+
+        children = [run_child(src_dir, env) for _ in range(args.runs)]
+        startup_seconds = statistics.median(
+            run_help(src_dir, env) for _ in range(args.runs)
+        )
+
+    results = {
+        key: statistics.median(child[key] for child in children)
+        for key in ["import_seconds", "load_seconds", "max_rss_mb"]
+    }
+    results["startup_seconds"] = startup_seconds
+
+    budgets = {
+        "import_seconds": args.max_import_seconds,
+        "load_seconds": args.max_load_seconds,
+        "startup_seconds": args.max_startup_seconds,
+        "max_rss_mb": args.max_rss_mb,
+    }
+
+    failed = False
+    for key, budget in budgets.items():
+        ok = results[key] <= budget
+        failed = failed or not ok
+        print(f"{key:16} {results[key]:8.3f} (budget {budget:.3f}) {'OK' if ok else 'FAIL'}")
+
+    loaded = sorted({m for child in children for m in child["loaded_lazy_modules"]})
+    if loaded:
+        failed = True
+        print("Command-only profile loaded:", ", ".join(loaded), "FAIL")
+
+    sys.exit(1 if failed else 0)
+
+
+# -----------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    main()
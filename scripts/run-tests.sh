@@ -1,2 +1,24 @@
 #!/usr/bin/env bash
-echo "No tests"
+set -e
+
+# Directory of *this* script
+this_dir="$( cd "$( dirname "$0" )" && pwd )"
+src_dir="$(realpath "${this_dir}/..")"
+
+venv="${src_dir}/.venv"
+if [[ -d "${venv}" ]]; then
+    echo "Using virtual environment at ${venv}"
+    source "${venv}/bin/activate"
+fi
+
+# -----------------------------------------------------------------------------
+
+cd "${src_dir}"
+python3 -m unittest
+
+# Import time, startup time and memory budget
+python3 "${this_dir}/check-startup.py" "$@"
+
+# -----------------------------------------------------------------------------
+
+echo "OK"
@@ -1 +1 @@
-"""No tests yet"""
+"""Tests for rhasspyintentaction_hermes"""
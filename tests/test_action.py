@@ -0,0 +1,61 @@
+"""Tests for action outcomes and concurrency limits"""
+import asyncio
+import unittest
+
+from rhasspyintentaction_hermes.ActionManager import Action, Outcome
+
+
+class FakeHandler:
+    def __init__(self, response=None, error=None, delay=0.0):
+        self.response = response
+        self.error = error
+        self.delay = delay
+
+    async def handle_intent(self, intent):
+        await asyncio.sleep(self.delay)
+        if self.error:
+            raise self.error
+
+        return self.response
+
+
+def make_action(handler, **data) -> Action:
+    return Action({"name": "test", "handler": handler, **data})
+
+
+class ActionTestCase(unittest.TestCase):
+    """Outcome of Action.handle_intent"""
+
+    def test_ok(self):
+        response = {"speech": {"text": "hello"}}
+        action = make_action(FakeHandler(response=response))
+
+        self.assertEqual(asyncio.run(action.handle_intent(None)), (Outcome.OK, response))
+
+    def test_no_response(self):
+        action = make_action(FakeHandler())
+
+        self.assertEqual(asyncio.run(action.handle_intent(None)), (Outcome.NO_RESPONSE, None))
+
+    def test_error(self):
+        action = make_action(FakeHandler(error=RuntimeError("HTTP 500")))
+
+        self.assertEqual(asyncio.run(action.handle_intent(None)), (Outcome.ERROR, None))
+        self.assertEqual(action.limit.running, 0)
+
+    def test_no_handler(self):
+        action = make_action(None)
+
+        self.assertEqual(asyncio.run(action.handle_intent(None)), (Outcome.NO_ACTION, None))
+
+    def test_queue_timeout(self):
+        action = make_action(
+            FakeHandler(response={}, delay=0.2), max_concurrency=1, max_queue_wait=0.05
+        )
+
+        async def run():
+            return await asyncio.gather(action.handle_intent(None), action.handle_intent(None))
+
+        outcomes = [outcome for outcome, _ in asyncio.run(run())]
+        self.assertEqual(outcomes, [Outcome.NO_RESPONSE, Outcome.QUEUE_TIMEOUT])
+        self.assertEqual(action.limit.get_statistics(), {"waiting": 0, "running": 0})
@@ -0,0 +1,157 @@
+"""Tests for the audit log"""
+import asyncio
+import glob
+import json
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+from rhasspyintentaction_hermes.AuditLog import (
+    AuditFormat,
+    AuditLog,
+    JsonLinesAuditWriter,
+    SqliteAuditWriter,
+)
+
+
+def record(audit_log: AuditLog, count: int):
+    for i in range(count):
+        audit_log.record(f"Intent{i}", "default", None, "action", 0.01, "ok")
+
+
+async def wait_for(condition, timeout: float = 2.0):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not condition():
+        if loop.time() > deadline:
+            raise TimeoutError("Condition not met")
+        await asyncio.sleep(0.01)
+
+
+# -----------------------------------------------------------------------------
+
+
+class SqliteAuditLogTestCase(unittest.TestCase):
+    """Queueing, batching and flushing of records"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "audit.db")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def read_intents(self):
+        with sqlite3.connect(self.path) as connection:
+            return [row[0] for row in connection.execute("SELECT intent FROM audit")]
+
+    def test_queue_full_drops(self):
+        async def run():
+            audit_log = AuditLog(self.path, queue_size=2)
+            await audit_log.start()
+            record(audit_log, 5)
+
+            self.assertEqual(audit_log.dropped, 3)
+
+            await audit_log.stop()
+            self.assertEqual(audit_log.written, 2)
+
+        asyncio.run(run())
+        self.assertEqual(self.read_intents(), ["Intent0", "Intent1"])
+
+    def test_batches(self):
+        async def run():
+            audit_log = AuditLog(self.path, batch_size=3)
+            await audit_log.start()
+
+            with patch.object(
+                SqliteAuditWriter, "write", autospec=True, side_effect=SqliteAuditWriter.write
+            ) as write:
+                record(audit_log, 7)
+                await wait_for(lambda: audit_log.written == 7)
+
+            await audit_log.stop()
+            return [len(call.args[1]) for call in write.call_args_list]
+
+        self.assertEqual(asyncio.run(run()), [3, 3, 1])
+        self.assertEqual(len(self.read_intents()), 7)
+
+    def test_stop_flushes(self):
+        async def run():
+            audit_log = AuditLog(self.path)
+            await audit_log.start()
+            record(audit_log, 5)
+
+            await audit_log.stop()
+            self.assertEqual(audit_log.written, 5)
+
+        asyncio.run(run())
+        self.assertEqual(self.read_intents(), [f"Intent{i}" for i in range(5)])
+
+    def test_record_before_start_ignored(self):
+        audit_log = AuditLog(self.path)
+        record(audit_log, 1)
+
+        self.assertEqual((audit_log.written, audit_log.dropped), (0, 0))
+
+
+# -----------------------------------------------------------------------------
+
+
+class JsonLinesAuditLogTestCase(unittest.TestCase):
+    """Rotation and retention of JSON lines files"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "audit.jsonl")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_rotation_keeps_all_records(self):
+        """Several rotations within a second do not overwrite each other"""
+        writer = JsonLinesAuditWriter(self.path, None, max_bytes=300)
+        writer.open()
+        for i in range(8):
+            writer.write([{"intent": f"Intent{i}", "speech": "x" * 200}])
+        writer.close()
+
+        intents = []
+        for file_path in glob.glob(self.path + "*"):
+            with open(file_path) as audit_file:
+                intents.extend(json.loads(line)["intent"] for line in audit_file)
+
+        self.assertEqual(sorted(intents), sorted(f"Intent{i}" for i in range(8)))
+
+    def test_retention_while_idle(self):
+        """Old rotated files are removed without any new records"""
+        old_path = self.path + ".20000101-000000"
+        recent_path = self.path + ".29990101-000000"
+        for file_path in (old_path, recent_path):
+            with open(file_path, "w") as audit_file:
+                audit_file.write("{}\n")
+
+        old_time = time.time() - 3 * 86400
+        os.utime(old_path, (old_time, old_time))
+
+        async def run():
+            audit_log = AuditLog(
+                self.path,
+                audit_format=AuditFormat.JSONL,
+                retention_days=1,
+                expire_interval=0.05,
+            )
+            await audit_log.start()
+            try:
+                await wait_for(lambda: not os.path.exists(old_path))
+
+                # Expires again on the timer, not only at start
+                os.utime(recent_path, (old_time, old_time))
+                await wait_for(lambda: not os.path.exists(recent_path))
+            finally:
+                await audit_log.stop()
+
+        asyncio.run(run())
@@ -0,0 +1,164 @@
+"""Tests for remote_http endpoint selection"""
+import collections
+import unittest
+from unittest.mock import patch
+
+from rhasspyintentaction_hermes.handlers.remote_http.balancer import (
+    LoadBalancer,
+    Strategy,
+)
+
+URLS = ["http://a/intent", "http://b/intent", "http://c/intent"]
+
+
+class LoadBalancerTestCase(unittest.TestCase):
+    """Selection, passive health tracking and hedge delay"""
+
+    def test_unsupported_strategy(self):
+        with self.assertRaises(ValueError):
+            LoadBalancer(URLS, strategy="random")
+
+    def test_round_robin(self):
+        balancer = LoadBalancer(URLS, strategy=Strategy.ROUND_ROBIN)
+        urls = [balancer.select().url for _ in range(6)]
+
+        self.assertEqual(sorted(urls[:3]), sorted(URLS))
+        self.assertEqual(urls[:3], urls[3:])
+
+    def test_least_in_flight(self):
+        balancer = LoadBalancer(URLS, strategy=Strategy.LEAST_IN_FLIGHT)
+        balancer.endpoints[0].in_flight = 2
+        balancer.endpoints[1].in_flight = 1
+
+        for _ in range(3):
+            self.assertEqual(balancer.select().url, URLS[2])
+
+    def test_ewma_prefers_fast_endpoint(self):
+        balancer = LoadBalancer(URLS, strategy=Strategy.EWMA)
+        for endpoint, latency in zip(balancer.endpoints, [0.5, 0.1, 0.3]):
+            balancer.record_success(endpoint, latency)
+
+        for _ in range(3):
+            self.assertEqual(balancer.select().url, URLS[1])
+
+    def test_ewma_probes_unmeasured_endpoint(self):
+        balancer = LoadBalancer(URLS[:2], strategy=Strategy.EWMA)
+        balancer.record_success(balancer.endpoints[0], 0.1)
+
+        self.assertEqual(balancer.select().url, URLS[1])
+
+    def test_ewma_decay(self):
+        balancer = LoadBalancer(URLS[:1], ewma_decay=0.5)
+        endpoint = balancer.endpoints[0]
+        balancer.record_success(endpoint, 1.0)
+        balancer.record_success(endpoint, 0.0)
+
+        self.assertAlmostEqual(endpoint.ewma, 0.5)
+
+    def test_failure_penalty(self):
+        balancer = LoadBalancer(URLS[:2], strategy=Strategy.EWMA, failure_penalty=1.0)
+        balancer.record_success(balancer.endpoints[1], 0.2)
+        balancer.record_failure(balancer.endpoints[0], 0.01)
+
+        self.assertAlmostEqual(balancer.endpoints[0].ewma, 1.01)
+        self.assertEqual(balancer.select().url, URLS[1])
+
+    def test_cancelled_counts_with_penalty(self):
+        """A slow replica losing against hedged copies does not stay preferred"""
+        balancer = LoadBalancer(URLS[:2], strategy=Strategy.HEDGED, failure_penalty=1.0)
+        slow, fast = balancer.endpoints
+        balancer.record_success(fast, 0.2)
+        balancer.record_cancelled(slow, 0.1)
+
+        self.assertAlmostEqual(slow.ewma, 1.1)
+        self.assertEqual(slow.failures, 0)
+        self.assertEqual(balancer.select().url, URLS[1])
+
+    def test_ejection(self):
+        balancer = LoadBalancer(
+            URLS[:2], eject_after_failures=2, eject_seconds=30.0
+        )
+        failing = balancer.endpoints[0]
+
+        with patch("time.monotonic", return_value=100.0):
+            balancer.record_failure(failing, 0.0)
+            self.assertEqual(len(balancer.available()), 2)
+
+            balancer.record_failure(failing, 0.0)
+            self.assertEqual([e.url for e in balancer.available()], [URLS[1]])
+            self.assertTrue(balancer.get_statistics()[0]["ejected"])
+
+            for _ in range(4):
+                self.assertEqual(balancer.select().url, URLS[1])
+
+        with patch("time.monotonic", return_value=131.0):
+            self.assertEqual(len(balancer.available()), 2)
+
+    def test_recovered_endpoint_probed_again(self):
+        """After eject_seconds the penalized EWMA no longer keeps an endpoint out"""
+        balancer = LoadBalancer(
+            URLS, strategy=Strategy.EWMA, eject_after_failures=3, eject_seconds=30.0
+        )
+        failing = balancer.endpoints[0]
+
+        with patch("time.monotonic", return_value=100.0):
+            for _ in range(3):
+                balancer.record_failure(failing, 0.0)
+
+        with patch("time.monotonic", return_value=131.0):
+            counts = collections.Counter(balancer.select().url for _ in range(300))
+
+        self.assertIsNone(failing.ewma)
+        self.assertEqual(counts, {url: 100 for url in URLS})
+
+    def test_ties_share_load_evenly(self):
+        balancer = LoadBalancer(URLS, strategy=Strategy.EWMA)
+        balancer.record_success(balancer.endpoints[0], 1.0)
+
+        counts = collections.Counter(balancer.select().url for _ in range(300))
+        self.assertEqual(counts, {URLS[1]: 150, URLS[2]: 150})
+
+    def test_success_resets_failures(self):
+        balancer = LoadBalancer(URLS[:2], eject_after_failures=2)
+        endpoint = balancer.endpoints[0]
+        balancer.record_failure(endpoint, 0.0)
+        balancer.record_success(endpoint, 0.1)
+        balancer.record_failure(endpoint, 0.0)
+
+        self.assertEqual(len(balancer.available()), 2)
+
+    def test_all_ejected_uses_all(self):
+        balancer = LoadBalancer(URLS[:2], eject_after_failures=1)
+        for endpoint in balancer.endpoints:
+            balancer.record_failure(endpoint, 0.0)
+
+        self.assertEqual(len(balancer.available()), 2)
+
+    def test_select_excludes(self):
+        balancer = LoadBalancer(URLS[:2], strategy=Strategy.EWMA)
+        primary = balancer.select()
+
+        for _ in range(3):
+            self.assertNotEqual(balancer.select(exclude=(primary,)), primary)
+
+        self.assertIsNone(balancer.select(exclude=balancer.endpoints))
+
+    def test_hedge_delay_only_for_hedged(self):
+        balancer = LoadBalancer(URLS, strategy=Strategy.EWMA, hedge_delay=0.1)
+        self.assertIsNone(balancer.get_hedge_delay())
+
+    def test_hedge_delay_until_enough_samples(self):
+        balancer = LoadBalancer(
+            URLS, strategy=Strategy.HEDGED, hedge_delay=0.1, hedge_min_samples=20
+        )
+        for _ in range(19):
+            balancer.record_success(balancer.endpoints[0], 1.0)
+
+        self.assertEqual(balancer.get_hedge_delay(), 0.1)
+
+    def test_hedge_delay_is_p95(self):
+        balancer = LoadBalancer(URLS, strategy=Strategy.HEDGED, hedge_min_samples=20)
+        for i in range(1, 101):
+            balancer.record_success(balancer.endpoints[i % 3], i / 100)
+
+        self.assertAlmostEqual(balancer.get_hedge_delay(), 0.95)
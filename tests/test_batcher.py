@@ -0,0 +1,149 @@
+"""Tests for micro-batched delivery"""
+import asyncio
+import unittest
+
+from rhasspyintentaction_hermes.handlers.batcher import MicroBatcher, get_item_errors
+
+
+class ItemErrorsTestCase(unittest.TestCase):
+    """Per-item errors of batch endpoint responses"""
+
+    def test_list_response(self):
+        self.assertEqual(
+            get_item_errors([None, True, {}, {"error": "rejected"}, False], 5),
+            [None, None, None, "rejected", "False"],
+        )
+
+    def test_short_list_response(self):
+        self.assertEqual(get_item_errors([None], 3), [None, "no result", "no result"])
+
+    def test_other_response(self):
+        self.assertEqual(get_item_errors(None, 2), [None, None])
+        self.assertEqual(get_item_errors({"status": "ok"}, 2), [None, None])
+
+
+# -----------------------------------------------------------------------------
+
+
+class MicroBatcherTestCase(unittest.TestCase):
+    """Coalescing by window and size, flush on stop"""
+
+    def setUp(self):
+        self.batches = []
+
+    async def deliver(self, items):
+        self.batches.append(items)
+        return [None if item != "bad" else "rejected" for item in items]
+
+    def test_window(self):
+        async def run():
+            batcher = MicroBatcher("test", self.deliver, window=0.05, max_size=10)
+            for item in ["a", "b", "c"]:
+                batcher.add(item, item)
+
+            self.assertEqual(self.batches, [])
+            await asyncio.sleep(0.1)
+            self.assertEqual(self.batches, [["a", "b", "c"]])
+
+        asyncio.run(run())
+
+    def test_max_size(self):
+        async def run():
+            batcher = MicroBatcher("test", self.deliver, window=10.0, max_size=2)
+            for item in ["a", "b", "c"]:
+                batcher.add(item, item)
+
+            await asyncio.sleep(0)
+            self.assertEqual(self.batches, [["a", "b"]])
+
+            await batcher.stop()
+            self.assertEqual(self.batches, [["a", "b"], ["c"]])
+
+        asyncio.run(run())
+
+    def test_failures_counted(self):
+        async def run():
+            batcher = MicroBatcher("test", self.deliver, window=10.0)
+            for item in ["a", "bad", "c"]:
+                batcher.add(item, item)
+
+            await batcher.stop()
+            self.assertEqual((batcher.delivered, batcher.failed), (2, 1))
+
+        asyncio.run(run())
+
+    def test_delivery_error_fails_all(self):
+        async def deliver(items):
+            raise ConnectionError("unreachable")
+
+        async def run():
+            batcher = MicroBatcher("test", deliver, window=10.0)
+            batcher.add("a", "a")
+            batcher.add("b", "b")
+
+            await batcher.stop()
+            self.assertEqual((batcher.delivered, batcher.failed), (0, 2))
+
+        asyncio.run(run())
+
+    def test_deliveries_chained(self):
+        """A slow endpoint gets at most max_in_flight deliveries, the rest waits"""
+
+        async def run():
+            release = asyncio.Event()
+            started = []
+
+            async def deliver(items):
+                started.append(items)
+                await release.wait()
+                self.batches.append(items)
+                return [None] * len(items)
+
+            batcher = MicroBatcher("test", deliver, window=0.01, max_size=2)
+            for item in "abcdefg":
+                batcher.add(item, item)
+                await asyncio.sleep(0)
+
+            await asyncio.sleep(0.05)
+            self.assertEqual(started, [["a", "b"]])
+
+            release.set()
+            await batcher.stop()
+
+        asyncio.run(run())
+        self.assertEqual(self.batches, [["a", "b"], ["c", "d"], ["e", "f"], ["g"]])
+
+    def test_max_queued(self):
+        async def run():
+            release = asyncio.Event()
+
+            async def deliver(items):
+                await release.wait()
+                return [None] * len(items)
+
+            batcher = MicroBatcher("test", deliver, window=10.0, max_size=2, max_queued=4)
+            with self.assertLogs("rhasspyintentaction_hermes", "ERROR"):
+                for item in "abcdefgh":
+                    batcher.add(item, item)
+                    await asyncio.sleep(0)
+
+            release.set()
+            await batcher.stop()
+            self.assertEqual((batcher.delivered, batcher.failed), (6, 2))
+
+        asyncio.run(run())
+
+    def test_add_after_stop_fails(self):
+        async def run():
+            batcher = MicroBatcher("test", self.deliver, window=0.01)
+            batcher.add("a", "a")
+            await batcher.stop()
+
+            with self.assertLogs("rhasspyintentaction_hermes", "ERROR"):
+                batcher.add("b", "b")
+
+            await asyncio.sleep(0.05)
+            self.assertEqual(self.batches, [["a"]])
+            self.assertEqual((batcher.delivered, batcher.failed), (1, 1))
+
+        asyncio.run(run())
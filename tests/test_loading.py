@@ -0,0 +1,133 @@
+"""Tests for intents arriving while actions are loading"""
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+from rhasspyhermes.intent import Intent
+from rhasspyhermes.nlu import NluIntent
+
+from rhasspyintentaction_hermes import IntentActionHermesMqtt
+from rhasspyintentaction_hermes.ActionManager import Outcome
+
+
+class GatedHandler:
+    """Handler whose initialize blocks until released"""
+
+    released = threading.Event()
+
+    def __init__(self, environment):
+        self.environment = environment
+
+    def initialize(self):
+        GatedHandler.released.wait(5.0)
+
+    async def handle_intent(self, intent):
+        return {"speech": {"text": "handled"}}
+
+
+class FakeAuditLog:
+    def __init__(self):
+        self.outcomes = []
+
+    def record(self, intent_name, site_id, session_id, action_name, seconds, outcome, speech):
+        self.outcomes.append((intent_name, action_name, outcome))
+
+
+def make_intent(intent_name: str) -> NluIntent:
+    return NluIntent(
+        input="test", intent=Intent(intent_name=intent_name, confidence_score=1.0)
+    )
+
+
+# -----------------------------------------------------------------------------
+
+
+class LoadingTestCase(unittest.TestCase):
+    """Intents are held back until their action is ready, for a bounded time"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.profile_dir = self.temp_dir.name
+        GatedHandler.released.clear()
+
+        action_dir = os.path.join(self.profile_dir, "actions", "gated")
+        os.makedirs(action_dir)
+        with open(os.path.join(action_dir, "manifest.json"), "w") as manifest_file:
+            json.dump({"type": f"{__name__}.GatedHandler"}, manifest_file)
+
+        self.write_intent_map({"Greet": {"action": "gated"}})
+
+    def tearDown(self):
+        GatedHandler.released.set()
+        self.temp_dir.cleanup()
+
+    def write_intent_map(self, intent_map):
+        with open(os.path.join(self.profile_dir, "intent_map.json"), "w") as map_file:
+            json.dump(intent_map, map_file)
+
+    def run_with_hermes(self, test, action_load_timeout: float = 2.0):
+        async def run():
+            audit_log = FakeAuditLog()
+            hermes = IntentActionHermesMqtt(
+                MagicMock(),
+                action_load_timeout=action_load_timeout,
+                audit_log=audit_log,
+            )
+            load_task = asyncio.ensure_future(hermes.load_async())
+            try:
+                await test(hermes, audit_log)
+            finally:
+                GatedHandler.released.set()
+                await load_task
+
+        with patch.dict(os.environ, {"RHASSPY_PROFILE_DIR": self.profile_dir}):
+            asyncio.run(run())
+
+    def test_handled_once_ready(self):
+        async def test(hermes, audit_log):
+            dispatch = asyncio.ensure_future(
+                self.collect(hermes.dispatch_event(make_intent("Greet")))
+            )
+            await asyncio.sleep(0.1)
+            self.assertFalse(dispatch.done())
+
+            GatedHandler.released.set()
+            messages = await dispatch
+
+            self.assertEqual([m.text for m in messages], ["handled"])
+            self.assertEqual(audit_log.outcomes, [("Greet", "gated", Outcome.OK)])
+
+        self.run_with_hermes(test)
+
+    def test_not_ready_after_timeout(self):
+        async def test(hermes, audit_log):
+            messages = await self.collect(hermes.dispatch_event(make_intent("Greet")))
+
+            self.assertEqual(messages, [])
+            self.assertEqual(audit_log.outcomes, [("Greet", "gated", Outcome.NOT_READY)])
+
+        self.run_with_hermes(test, action_load_timeout=0.1)
+
+    def test_load_error_fails_fast(self):
+        """A broken intent map is logged right away and waiters do not wait out the timeout"""
+        self.write_intent_map({"Greet": {"action": "gated"}, "Broken": "oops"})
+
+        async def test(hermes, audit_log):
+            start_time = time.perf_counter()
+            with self.assertLogs("rhasspyintentaction_hermes", "ERROR"):
+                messages = await self.collect(hermes.dispatch_event(make_intent("Greet")))
+
+            self.assertLess(time.perf_counter() - start_time, 1.0)
+            self.assertEqual(messages, [])
+            self.assertEqual(audit_log.outcomes, [("Greet", "gated", Outcome.NO_ACTION)])
+
+        self.run_with_hermes(test, action_load_timeout=5.0)
+
+    @staticmethod
+    async def collect(messages):
+        return [message async for message in messages]
@@ -0,0 +1,201 @@
+"""Tests for the Home Assistant state mirror"""
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from rhasspyhermes.intent import Intent
+from rhasspyhermes.nlu import NluIntent
+
+from rhasspyintentaction_hermes.handlers.homeassistant import HomeAssistantIntendHandler
+
+
+class StubHomeAssistant:
+    """Serves /api/states, /api/websocket and /api/intent/handle"""
+
+    def __init__(self):
+        self.states = [
+            {"entity_id": "cover.garage_door", "state": "closed"},
+            {"entity_id": "light.kitchen", "state": "on"},
+        ]
+        self.intent_calls = 0
+        self.sockets = []
+        self.server = None
+
+        app = web.Application()
+        app.router.add_get("/api/states", self.handle_states)
+        app.router.add_get("/api/websocket", self.handle_websocket)
+        app.router.add_post("/api/intent/handle", self.handle_intent)
+        self.app = app
+
+    async def start(self) -> str:
+        self.server = TestServer(self.app)
+        await self.server.start_server()
+        return str(self.server.make_url("/"))
+
+    async def close(self):
+        await self.server.close()
+
+    async def handle_states(self, request):
+        return web.json_response(self.states)
+
+    async def handle_intent(self, request):
+        self.intent_calls += 1
+        return web.json_response({"speech": {"text": "remote"}})
+
+    async def handle_websocket(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+
+        await ws.send_json({"type": "auth_required"})
+        message = await ws.receive_json()
+        if message.get("access_token") != "token":
+            await ws.send_json({"type": "auth_invalid"})
+            return ws
+
+        await ws.send_json({"type": "auth_ok"})
+        message = await ws.receive_json()
+        await ws.send_json({"id": message["id"], "type": "result", "success": True})
+
+        self.sockets.append(ws)
+        async for _ in ws:
+            pass
+
+        return ws
+
+    async def change_state(self, entity_id: str, state: str):
+        for ws in self.sockets:
+            await ws.send_json(
+                {
+                    "id": 1,
+                    "type": "event",
+                    "event": {
+                        "data": {
+                            "entity_id": entity_id,
+                            "new_state": {"entity_id": entity_id, "state": state},
+                        }
+                    },
+                }
+            )
+
+
+# -----------------------------------------------------------------------------
+
+
+class Environment:
+    def __init__(self, self_directory: str):
+        self.self_directory = self_directory
+
+
+def make_intent(intent_name: str) -> NluIntent:
+    return NluIntent(
+        input="test", intent=Intent(intent_name=intent_name, confidence_score=1.0)
+    )
+
+
+async def wait_for(condition, timeout: float = 2.0):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not condition():
+        if loop.time() > deadline:
+            raise TimeoutError("Condition not met")
+        await asyncio.sleep(0.01)
+
+
+# -----------------------------------------------------------------------------
+
+
+class StateMirrorTestCase(unittest.TestCase):
+    """Query intents answered from the mirror with fallback to Home Assistant"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def run_with_handler(self, test, **definition):
+        async def run():
+            stub = StubHomeAssistant()
+            url = await stub.start()
+
+            with open(os.path.join(self.temp_dir.name, "def.json"), "w") as def_file:
+                json.dump(
+                    {
+                        "url": url,
+                        "access_token": "token",
+                        "handle_type": "intent",
+                        "mirror_entities": ["cover.garage_door"],
+                        "mirror_max_age": 0.2,
+                        "query_templates": {
+                            "GetGarageState": "The garage door is {states[cover.garage_door][state]}"
+                        },
+                        **definition,
+                    },
+                    def_file,
+                )
+
+            handler = HomeAssistantIntendHandler(Environment(self.temp_dir.name))
+            handler.initialize()
+
+            # Only reconnect after the mirror turned stale
+            handler.state_mirror.reconnect_delay = 10.0
+
+            await handler.start()
+            try:
+                await wait_for(lambda: handler.state_mirror.fresh)
+                await test(stub, handler)
+            finally:
+                await handler.stop()
+                await stub.close()
+
+        asyncio.run(run())
+
+    def test_query_answered_locally(self):
+        """Query is answered from the mirror and follows state changes"""
+
+        async def test(stub, handler):
+            response = await handler.handle_intent(make_intent("GetGarageState"))
+            self.assertEqual(response["speech"]["text"], "The garage door is closed")
+
+            await stub.change_state("cover.garage_door", "open")
+            await wait_for(
+                lambda: handler.state_mirror.states["cover.garage_door"]["state"] == "open"
+            )
+
+            response = await handler.handle_intent(make_intent("GetGarageState"))
+            self.assertEqual(response["speech"]["text"], "The garage door is open")
+            self.assertEqual(stub.intent_calls, 0)
+
+        self.run_with_handler(test)
+
+    def test_stale_falls_back_to_remote(self):
+        """Query goes to api/intent/handle once the mirror is older than mirror_max_age"""
+
+        async def test(stub, handler):
+            for ws in stub.sockets:
+                await ws.close()
+
+            await wait_for(lambda: not handler.state_mirror.fresh)
+
+            response = await handler.handle_intent(make_intent("GetGarageState"))
+            self.assertEqual(response["speech"]["text"], "remote")
+            self.assertEqual(stub.intent_calls, 1)
+
+        self.run_with_handler(test)
+
+    def test_bad_template_falls_back_to_remote(self):
+        """Template errors are answered by api/intent/handle"""
+
+        async def test(stub, handler):
+            response = await handler.handle_intent(make_intent("GetGarageState"))
+            self.assertEqual(response["speech"]["text"], "remote")
+            self.assertEqual(stub.intent_calls, 1)
+
+        self.run_with_handler(
+            test,
+            query_templates={"GetGarageState": "{states[cover.garage_door].state}"},
+        )